@@ -1,25 +1,36 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, render_template_string
-import requests
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, render_template_string, jsonify, Response, stream_with_context, g
 import os
 from datetime import datetime, timezone
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
 from dotenv import load_dotenv
-from pydrive.auth import GoogleAuth
-from pydrive.drive import GoogleDrive
 import pytz
 import tempfile
-import shutil
-import hashlib
 import base64
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from googleapiclient.http import HttpRequest
-from googleapiclient.http import MediaIoBaseDownload
-from flask_mail import Mail, Message
-from apscheduler.schedulers.background import BackgroundScheduler
+import codecs
+import io
+import json
+import click
+from lazy import lazy_import
+from visit_store import VisitStore
+from visit_query import VisitIndex, datatables_query
+from compact import USER_COLUMNS, VisitTable, compact_users
+from normalize import VISIT_COLUMNS, normalize_frame
+from user_delta import apply_delta, diff_users, hash_users
+import ua_classifier
+from rollups import TrafficRollups
+from upload_queue import UploadQueue
+from checksums import FrameHasher, HashingWriter, frame_fingerprint, remember_checksum
+from http_client import ConditionalClient
+import exports
+import metrics
+import live_feed
+from daily_report import ReportCache, XLSX_MIMETYPE, write_report
+
+# Heavy dependencies (pandas, Google clients, APScheduler, Flask-Mail) load on
+# first use, so importing this module is cheap and starts nothing
+pd = lazy_import("pandas")
 
 
 os.environ['TZ'] = 'Asia/Kolkata'
@@ -40,12 +51,13 @@ def write_client_secrets():
     except Exception as e:
         print(f"❌ Failed to decode client_secrets.json: {e}")
 
-# Call it right after defining
-write_client_secrets()
-
 
 
 def init_drive():
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest
+
     try:
         # Decode base64 service account credentials from environment variable
         base64_creds = os.getenv("GOOGLE_CREDS_BASE64")
@@ -79,21 +91,27 @@ def init_drive():
         print(f"❌ Failed to initialize Google Drive: {e}")
         return None
 
-# ✅ Initialize Drive
-drive_service = init_drive() # ✅ This must match what you're using in upload_to_drive()
-
 
 
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "default_key")
 
 # ✅ Add this block here
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+# Overridable for a local debugging SMTP server, e.g. MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0
+app.config['MAIL_SERVER'] = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+app.config['MAIL_PORT'] = int(os.getenv("MAIL_PORT", "587"))
+app.config['MAIL_USE_TLS'] = os.getenv("MAIL_USE_TLS", "1") != "0"
 app.config['MAIL_USERNAME'] = os.getenv("GMAIL_USER")
 app.config['MAIL_PASSWORD'] = os.getenv("GMAIL_PASS")
-mail = Mail(app)
+mail = None  # see get_mail()
+
+
+def get_mail():
+    global mail
+    if mail is None:
+        from flask_mail import Mail
+        mail = Mail(app)
+    return mail
 
 USERNAME = os.getenv("FLASK_USERNAME")
 PASSWORD = os.getenv("FLASK_PASSWORD")
@@ -101,56 +119,168 @@ PASSWORD = os.getenv("FLASK_PASSWORD")
 DATA_URL = "https://heritage-flask-app.onrender.com/admin/visits?password=Shad@!admin123"
 EXCEL_ALL_FILE = "visitor_data.xlsx"
 DATA_FOLDER = "visitor_logs"  # Folder for date-wise Excel files
+VISIT_STORE_DIR = "visit_store"  # Append-only Parquet store, source of truth for visits
 
 USER_DATA_URL = "https://heritage-flask-app.onrender.com/admin/users?password=Shad@!admin123"
 EXCEL_USERS_FILE = "user_data.xlsx"
+DRIVE_INDEX_FILE = "drive_index.json"  # name -> Drive id/md5/modifiedTime + changes page token
+EXCEL_FINGERPRINTS_FILE = "excel_fingerprints.json"  # path -> row hash + file stat of our last write
+
+REPORTS_DIR = "reports"  # Cached per-day report workbooks, see daily_report.py
+REPORT_RECIPIENTS = os.getenv("REPORT_RECIPIENTS", "your_email@example.com").split(",")
+
+# High-water mark of ingested visits (last IST timestamp + dedup keys at that second)
+FETCH_CURSOR_FILE = "fetch_cursor.json"
 
 
 # Ensure log folder exists
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
-fetched_data = []
-fetched_users = []
+# Visits (and, with sqlite, users) live in one of two embedded backends:
+#   parquet (default)  append-only segments under VISIT_STORE_DIR
+#   sqlite             WAL database at SQLITE_PATH with indexed queries
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "parquet")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "visitors.db")
+
+
+def open_visit_store():
+    if STORAGE_BACKEND == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(SQLITE_PATH)
+    return VisitStore(VISIT_STORE_DIR)
+
+
+visit_store = open_visit_store()
+
+# Immutable, dictionary-encoded tables; the fetch job swaps in new versions
+fetched_data = VisitTable()
+fetched_users = ()
+user_hashes = {}  # email -> content hash of the stored users, for the per-tick diff
+
+# Keep-alive session shared by both endpoints, fetched in parallel each tick
+http_client = ConditionalClient()
+fetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fetch")
 
 
 @app.route("/test")
 def test():
     return "✅ App is working!"
 
-def fetch_data():
+def load_fetch_cursor():
+    cursor = {"timestamp": "", "keys": set()}
+    if not os.path.exists(FETCH_CURSOR_FILE):
+        return cursor
     try:
-        response = requests.get(DATA_URL)
-        response.raise_for_status()
-        data = response.json()
+        with open(FETCH_CURSOR_FILE) as f:
+            saved = json.load(f)
+        cursor["timestamp"] = saved.get("timestamp", "")
+        cursor["keys"] = {tuple(k) for k in saved.get("keys", [])}
+    except Exception as e:
+        print(f"⚠️ Could not read fetch cursor, starting from scratch: {e}")
+    return cursor
 
-        ist = pytz.timezone('Asia/Kolkata')
-        cleaned = []
-        seen = set()
 
-        for d in data:
+def save_fetch_cursor(cursor):
+    try:
+        tmp_path = FETCH_CURSOR_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"timestamp": cursor["timestamp"], "keys": sorted(cursor["keys"])}, f)
+        os.replace(tmp_path, FETCH_CURSOR_FILE)
+    except Exception as e:
+        print(f"❌ Failed to save fetch cursor: {e}")
+
+
+def advance_cursor(cursor, rows):
+    """Move the cursor to the newest timestamp in rows, keeping the keys seen at that second."""
+    for row in rows:
+        key = (row["email"], row["ip"], row["timestamp"], row["user_agent"])
+        if row["timestamp"] > cursor["timestamp"]:
+            cursor["timestamp"] = row["timestamp"]
+            cursor["keys"] = {key}
+        elif row["timestamp"] == cursor["timestamp"]:
+            cursor["keys"].add(key)
+    return cursor
+
+
+def iter_json_array(response, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array as the body streams in."""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        metrics.inc("bytes_total", len(chunk), direction="fetched")
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
             try:
-                # Normalize timestamp format
-                raw_ts = d['timestamp']
-                if 'T' in raw_ts:
-                    utc_dt = datetime.fromisoformat(raw_ts.replace("Z", "+00:00"))
-                else:
-                    utc_dt = datetime.datetime.strptime(raw_ts, "%Y-%m-%d %H:%M:%S")
-
-                ist_dt = utc_dt.astimezone(ist)
-                formatted_ts = ist_dt.strftime('%Y-%m-%d %H:%M:%S')
-
-                # Create a deduplication key (email, ip, timestamp, agent)
-                key = (d.get("email", "Guest"), d.get("ip", ""), formatted_ts, d.get("user_agent", ""))
-                if key not in seen:
-                    seen.add(key)
-                    cleaned.append({
-                        "email": d.get("email", "Guest"),
-                        "ip": d.get("ip", ""),
-                        "timestamp": formatted_ts,
-                        "user_agent": d.get("user_agent", "")
-                    })
-            except Exception as e:
-                print(f"⚠️ Error parsing timestamp: {e}")
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element is split across chunks, wait for more data
+            yield item
+    if buf[pos:].strip():
+        raise ValueError("Truncated JSON array in response")
+
+
+def normalize_visits(records, cursor=None):
+    """Clean raw API visits in bulk: UTC -> IST strings, cursor filter, dedup."""
+    df = pd.DataFrame.from_records(records, columns=VISIT_COLUMNS)
+    if df.empty:
+        return []
+    df = normalize_frame(df)  # API timestamps are UTC
+
+    # Skip everything at or behind the cursor
+    if cursor and cursor["timestamp"]:
+        df = df[df["timestamp"] >= cursor["timestamp"]]
+        at_cursor = df["timestamp"] == cursor["timestamp"]
+        if at_cursor.any():
+            seen = [tuple(row) in cursor["keys"] for row in df.loc[at_cursor, VISIT_COLUMNS].itertuples(index=False)]
+            df = df.drop(df.index[at_cursor][seen])
+
+    # Deduplicate on (email, ip, timestamp, agent) in one hashed pass
+    df = df.drop_duplicates(subset=VISIT_COLUMNS)
+    columns = [df[c].tolist() for c in VISIT_COLUMNS]
+    return [dict(zip(VISIT_COLUMNS, row)) for row in zip(*columns)]
+
+
+def fetch_data(cursor=None):
+    """Fetch visits newer than cursor (everything when cursor is empty)."""
+    if cursor is None:
+        cursor = {"timestamp": "", "keys": set()}
+    try:
+        ist = pytz.timezone('Asia/Kolkata')
+        params = {}
+        if cursor["timestamp"]:
+            # Optional hint to /admin/visits to trim the payload. The server may ignore it
+            # (older deployments do), so normalize_visits applies the cursor filter as well
+            since = ist.localize(datetime.strptime(cursor["timestamp"], "%Y-%m-%d %H:%M:%S"))
+            params["since"] = since.astimezone(timezone.utc).isoformat()
+
+        with metrics.timed("fetch_http", endpoint="visits"):
+            response = http_client.get(DATA_URL, params=params, stream=True)
+        if response is None:
+            return []  # 304: nothing new since the last empty answer
+
+        with metrics.timed("parse", endpoint="visits"):  # includes streaming the body in
+            records = list(iter_json_array(response))
+        with metrics.timed("normalize"):
+            cleaned = normalize_visits(records, cursor)
+        if not cleaned:
+            # New rows move the cursor (and so the URL); only "nothing new" is worth revalidating
+            http_client.mark_processed(response)
         return cleaned
     except Exception as e:
         print(f"❌ Error fetching data: {e}")
@@ -160,9 +290,13 @@ def fetch_data():
 
 def fetch_users():
     try:
-        response = requests.get(USER_DATA_URL)
-        response.raise_for_status()
-        users = response.json()
+        with metrics.timed("fetch_http", endpoint="users"):
+            response = http_client.get(USER_DATA_URL)
+        if response is None:
+            return []  # 304: users unchanged
+        metrics.inc("bytes_total", len(response.content), direction="fetched")
+        with metrics.timed("parse", endpoint="users"):
+            users = response.json()
 
         cleaned_users = []
         for u in users:
@@ -174,38 +308,140 @@ def fetch_users():
                 "created_at": u.get("created_at", "")
             })
 
+        http_client.mark_processed(response)
         return cleaned_users
     except Exception as e:
         print(f"❌ Error fetching users: {e}")
         return []
 
 
-def save_users_to_excel(data):
-    df = pd.DataFrame(data)
-    df.drop_duplicates(inplace=True)
-    safe_write_excel(df, EXCEL_USERS_FILE)
-    time.sleep(0.2)
-    upload_to_drive(EXCEL_USERS_FILE)
-
+def save_users(records, delta):
+    """Persist a non-empty user delta; records is the full list with it applied."""
+    if STORAGE_BACKEND == "sqlite":
+        # Only the delta touches the database; the workbook is exported from it
+        visit_store.upsert_users([r.as_dict() for r in delta.added + delta.changed])
+        visit_store.delete_users(delta.removed)
+        df = visit_store.read_users()
+    else:
+        df = pd.DataFrame([r.as_dict() for r in records], columns=USER_COLUMNS)
+    if safe_write_excel(df, EXCEL_USERS_FILE):
+        upload_to_drive(EXCEL_USERS_FILE)
+
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def stream_export(frames, columns, fmt, download_name):
+    """Response that streams frames as csv/ndjson (gzip if accepted) or a write-only xlsx."""
+    if fmt not in EXPORT_MIMETYPES:
+        fmt = "csv"
+    if fmt == "xlsx":
+        # Opt-in only: openpyxl buffers the sheet until save(), so nothing can be sent
+        # before every row is written; the zip is assembled in a spooled temp file
+        fileobj = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        exports.write_xlsx(frames, columns, fileobj)
+        fileobj.seek(0)
+        return send_file(fileobj, as_attachment=True, download_name=f"{download_name}.xlsx",
+                         mimetype=EXPORT_MIMETYPES["xlsx"])
+
+    chunks = exports.iter_csv(frames, columns) if fmt == "csv" else exports.iter_ndjson(frames, columns)
+    headers = {"Content-Disposition": f"attachment; filename={download_name}.{fmt}"}
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        chunks = exports.iter_gzip(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
 
 
 @app.route("/download-users")
 def download_users():
     if "user" not in session:
         return redirect(url_for("login"))
+    fmt = request.args.get("format", "xlsx")
+    if fmt in ("csv", "ndjson"):
+        users = pd.DataFrame([u.as_dict() for u in get_snapshot().users], columns=USER_COLUMNS)
+        return stream_export([users], USER_COLUMNS, fmt, "user_data")
     if os.path.exists(EXCEL_USERS_FILE):
         return send_file(EXCEL_USERS_FILE, as_attachment=True)
     return "No user file found", 404
 
 
+excel_fingerprints = None
+excel_fingerprints_lock = threading.Lock()
+
+# One writer per local file: every path that replaces a file holds its lock.
+# Readers never take it; files are swapped in with os.replace, so they see old or new.
+file_locks = {}
+file_locks_lock = threading.Lock()
+
+
+def file_lock(path):
+    with file_locks_lock:
+        return file_locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+def load_excel_fingerprints():
+    global excel_fingerprints
+    if excel_fingerprints is None:
+        excel_fingerprints = {}
+        try:
+            if os.path.exists(EXCEL_FINGERPRINTS_FILE):
+                with open(EXCEL_FINGERPRINTS_FILE) as f:
+                    excel_fingerprints = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not read Excel fingerprints: {e}")
+    return excel_fingerprints
+
+
 def safe_write_excel(df, path):
+    """Write df to path atomically. Returns False when the file already holds this data."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            tmp_path = tmp.name
-        df.to_excel(tmp_path, index=False)  # Write after closing the file context
-        shutil.move(tmp_path, path)
+        with file_lock(path):
+            return _write_excel(df, path)
     except Exception as e:
         print(f"❌ Failed writing Excel safely: {e}")
+        return False
+
+
+def _write_excel(df, path):
+    fingerprint = frame_fingerprint(df)
+    if _excel_unchanged(path, fingerprint):
+        return False
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx", dir=os.path.dirname(path) or ".") as tmp:
+        tmp_path = tmp.name
+        writer = HashingWriter(tmp)  # md5 computed while writing, no re-read for upload
+        with metrics.timed("excel_write"):
+            df.to_excel(writer, index=False, engine="openpyxl")
+    _install_excel(tmp_path, path, writer.hexdigest(), fingerprint)
+    return True
+
+
+def _excel_unchanged(path, fingerprint):
+    """True when path holds these rows and is untouched since we wrote it."""
+    with excel_fingerprints_lock:
+        known = load_excel_fingerprints().get(path)
+    if known and known["rows"] == fingerprint and os.path.exists(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns] == known["stat"]
+    return False
+
+
+def _install_excel(tmp_path, path, md5, fingerprint):
+    os.replace(tmp_path, path)
+    remember_checksum(path, md5)
+
+    st = os.stat(path)
+    with excel_fingerprints_lock:
+        fingerprints = load_excel_fingerprints()
+        fingerprints[path] = {"rows": fingerprint, "stat": [st.st_size, st.st_mtime_ns]}
+        with open(EXCEL_FINGERPRINTS_FILE + ".tmp", "w") as f:
+            json.dump(fingerprints, f)
+        os.replace(EXCEL_FINGERPRINTS_FILE + ".tmp", EXCEL_FINGERPRINTS_FILE)
 
 
 
@@ -218,138 +454,546 @@ def is_valid_excel(file_path):
 
 
 
-def save_to_excel(data):
-    df_new = pd.DataFrame(data)
-    df_new.drop_duplicates(inplace=True)
-
-    # Safe full data save
+def seed_visit_store():
+    if not visit_store.is_empty():
+        return
+    # One-time migration into a fresh sqlite database from an existing Parquet store
+    if STORAGE_BACKEND == "sqlite":
+        parquet = VisitStore(VISIT_STORE_DIR)
+        if not parquet.is_empty():
+            for batch in parquet.iter_batches():
+                visit_store.append(batch)
+            print(f"📦 Migrated visit store from {VISIT_STORE_DIR} to {SQLITE_PATH}")
+            return
+    # One-time migration: import the legacy full workbook into the store
     if os.path.exists(EXCEL_ALL_FILE) and is_valid_excel(EXCEL_ALL_FILE):
-        df_existing = pd.read_excel(EXCEL_ALL_FILE)
-        combined = pd.concat([df_existing, df_new], ignore_index=True).drop_duplicates()
-    else:
-        combined = df_new
+        # Same cleanup as ingest: rows whose timestamp does not parse are dropped (IST already)
+        visit_store.append(normalize_frame(pd.DataFrame.from_records(load_visits_excel(), columns=VISIT_COLUMNS),
+                                           utc=False))
+        print(f"📦 Seeded visit store from {EXCEL_ALL_FILE}")
+
+
+def export_all_excel():
+    # visitor_data.xlsx is an export of the store, only built when asked for. The store's
+    # batches go straight into a write-only workbook: the history is never one DataFrame
+    try:
+        with file_lock(EXCEL_ALL_FILE):
+            changed = _export_store_excel(EXCEL_ALL_FILE)
+    except Exception as e:
+        print(f"❌ Failed exporting {EXCEL_ALL_FILE}: {e}")
+        return
+    if changed:
+        upload_to_drive(EXCEL_ALL_FILE)
+
+
+def _export_store_excel(path):
+    hasher = FrameHasher(VISIT_COLUMNS)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx", dir=os.path.dirname(path) or ".") as tmp:
+        tmp_path = tmp.name
+        writer = HashingWriter(tmp)
+        with metrics.timed("excel_write"):
+            exports.write_xlsx(hasher.hashed(visit_store.iter_batches()), VISIT_COLUMNS, writer)
+    # The rows are only known once written; an unchanged export is dropped, not uploaded again
+    if _excel_unchanged(path, hasher.hexdigest()):
+        os.remove(tmp_path)
+        return False
+    _install_excel(tmp_path, path, writer.hexdigest(), hasher.hexdigest())
+    return True
+
 
-    safe_write_excel(combined, EXCEL_ALL_FILE)
-    time.sleep(0.2)
-    upload_to_drive(EXCEL_ALL_FILE)
+def daily_log_path(day):
+    # day is "YYYY-MM-DD"
+    y, m, d = day.split("-")
+    return os.path.join(DATA_FOLDER, y, m, f"visitor_{d}.xlsx")
 
-    # Save date-wise files (collect unique paths first)
-    date_file_paths = set()
 
-    for item in data:
+def write_daily_logs(data):
+    """Merge new visits into their day files, writing each affected file once."""
+    df_new = pd.DataFrame(data, columns=VISIT_COLUMNS)
+    if df_new.empty:
+        return []
+    df_new = df_new.fillna("").astype(str).drop_duplicates()
+
+    # Validate all timestamps in one vectorized pass
+    parsed = pd.to_datetime(df_new["timestamp"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    if parsed.isna().any():
+        print(f"❌ Error saving daily log: {int(parsed.isna().sum())} rows with bad timestamps skipped")
+    df_new = df_new[parsed.notna()]
+
+    date_file_paths = []
+    for day, df_day in df_new.groupby(df_new["timestamp"].str[:10], sort=True):
         try:
-            ts = datetime.strptime(item['timestamp'], "%Y-%m-%d %H:%M:%S")
-            y, m, d = ts.strftime("%Y"), ts.strftime("%m"), ts.strftime("%d")
-            path = os.path.join(DATA_FOLDER, y, m)
-            os.makedirs(path, exist_ok=True)
-            file_path = os.path.join(path, f"visitor_{d}.xlsx")  # changed name here
-
-            df_day = pd.DataFrame([item])
-            if os.path.exists(file_path) and is_valid_excel(file_path):
-                df_existing = pd.read_excel(file_path)
-                df_day = pd.concat([df_existing, df_day], ignore_index=True).drop_duplicates()
-            safe_write_excel(df_day, file_path)
-
-            date_file_paths.add(file_path)  # collect path for upload
+            file_path = daily_log_path(day)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            with file_lock(file_path):  # read-merge-write as one unit
+                if os.path.exists(file_path):
+                    try:
+                        with metrics.timed("excel_read"):
+                            df_existing = pd.read_excel(file_path).fillna("").astype(str)
+                        df_day = pd.concat([df_existing, df_day], ignore_index=True).drop_duplicates()
+                    except Exception as e:
+                        print(f"⚠️ Replacing unreadable daily log {file_path}: {e}")
+                if safe_write_excel(df_day, file_path):
+                    date_file_paths.append(file_path)  # collect path for upload
         except Exception as e:
             print(f"❌ Error saving daily log: {e}")
+    return date_file_paths
+
+
+def save_to_excel(data):
+    # Append only the new rows to the store (O(new rows))
+    with metrics.timed("store_append"):
+        visit_store.append(data)
+
+    # Save date-wise files, one merge + write per affected day
+    date_file_paths = write_daily_logs(data)
 
-    # ✅ Upload only once per file
+    # ✅ Queue each day file once; the upload queue coalesces repeats
     for path in date_file_paths:
-        time.sleep(0.2)
         upload_to_drive(path)
 
+report_cache = None  # see get_daily_report()
+
+
+def get_daily_report(day):
+    """Path of the cached report for day ('YYYY-MM-DD'), rebuilt only if the day gained visits."""
+    global report_cache
+    if report_cache is None:
+        report_cache = ReportCache(REPORTS_DIR)
+    rollups = get_rollups()
+    totals = rollups.daily(day, day)["totals"]
+
+    def build(path):
+        with metrics.timed("report_build"):
+            write_report(path, day, visit_store.read_range(day, day), rollups.hourly(day), totals)
+
+    path, built = report_cache.get(day, totals["visits"], build)
+    if built:
+        print(f"🧾 Built daily report for {day} ({totals['visits']} visits)")
+    return path
+
+
+def backfill_reports(date_from=None, date_to=None):
+    """Build (or refresh) the cached report of every stored day in the range."""
+    for day in visit_store.days(date_from, date_to):
+        try:
+            get_daily_report(day)
+        except Exception as e:
+            print(f"❌ Failed to build report for {day}: {e}")
+
+
 def send_daily_report():
-    if not os.path.exists(EXCEL_ALL_FILE):
-        print("No file to send.")
-        return
+    from flask_mail import Message
+
     try:
-        msg = Message(subject="📊 Daily Visitor Report",
+        today = datetime.now(pytz.timezone("Asia/Kolkata")).strftime("%Y-%m-%d")
+        path = get_daily_report(today)
+        totals = get_rollups().daily(today, today)["totals"]
+        msg = Message(subject=f"📊 Daily Visitor Report {today}",
                       sender=os.getenv("GMAIL_USER"),
-                      recipients=["your_email@example.com"])
-        msg.body = "Attached is the visitor report for today."
-
-        with app.open_resource(EXCEL_ALL_FILE) as fp:
-            msg.attach("visitor_data.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", fp.read())
-
-        mail.send(msg)
+                      recipients=REPORT_RECIPIENTS)
+        msg.body = (f"Attached is the visitor report for {today}.\n\n"
+                    f"Visits: {totals['visits']}\n"
+                    f"Unique emails: {totals['unique_emails']}\n"
+                    f"Unique IPs: {totals['unique_ips']}\n")
+
+        with open(path, "rb") as fp:
+            msg.attach(os.path.basename(path), XLSX_MIMETYPE, fp.read())
+
+        # Runs on a scheduler thread; Flask-Mail needs an app context to send
+        with app.app_context():
+            get_mail().send(msg)
         print("✅ Email sent successfully.")
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
 
 
 
+# Ingestion pipeline: fetch -> normalize -> persist -> publish, one tick at a time.
+# The tick is the only writer of the store, the Excel logs and the in-memory
+# tables; requests read the published snapshot without taking any lock.
+ingest_lock = threading.Lock()
+
+
 def continuous_fetch():
+    # Scheduler entry point: a tick that finds the previous one still running is dropped
+    if not ingest_lock.acquire(blocking=False):
+        print("⏭️ Previous fetch still running, skipping this tick.")
+        metrics.inc("ticks_total", result="skipped")
+        return
+    try:
+        with metrics.timed("tick"):
+            ingest_tick()
+            if MULTI_WORKER:
+                export_shared_snapshot()
+        metrics.inc("ticks_total", result="ok")
+    except Exception as e:
+        metrics.inc("ticks_total", result="error")
+        print(f"❌ Error during continuous fetch: {e}")
+    finally:
+        ingest_lock.release()
+
+
+def prepare_ingest():
+    """Cold-start work for the first tick; returns the cursor to fetch from."""
+    global fetched_data, fetched_users, user_hashes
+
+    seed_visit_store()
+    cursor = load_fetch_cursor()
+    if cursor["timestamp"] and visit_store.is_empty():
+        print("⚠️ Local visit store empty, re-fetching full history.")
+        cursor = {"timestamp": "", "keys": set()}
+    if not len(fetched_data) and not visit_store.is_empty():
+        fetched_data = VisitTable.from_frame(visit_store.read_all())
+
+    if dashboard_snapshot is None:
+        # Drive is only consulted here, never on a request thread
+        download_from_drive(EXCEL_USERS_FILE)
+        get_snapshot()
+    if not user_hashes:
+        # Baseline for the users diff: whatever users.xlsx (or the database) holds
+        fetched_users = get_snapshot().users
+        user_hashes = hash_users(fetched_users)
+    get_rollups()
+    return cursor
+
+
+def ingest_tick():
     global fetched_data
     global fetched_users
+    global user_hashes
 
-    print("🔍 fetched_data:", fetched_data)
-    print("🔍 fetched_users:", fetched_users)
     print("⏰ Scheduler fetch running...")
     print("⏳ Auto-fetching visitor data...")
 
-    try:
-        # Fetch and update visitor data
-        data = fetch_data()
-        if data and data != fetched_data:
-            fetched_data = data
-            save_to_excel(fetched_data)
-            print("✅ Visitor data updated locally.")
-
-            # Upload full visitor data
-            upload_to_drive(EXCEL_ALL_FILE)
-            print(f"📤 Uploaded: {EXCEL_ALL_FILE}")
-
-            # Upload today's log if exists
-            today = datetime.today().strftime("%Y/%m/%d")
-            day_file = os.path.join(DATA_FOLDER, *today.split("/"), f"visitor_{today.split('/')[-1]}.xlsx")
-            if os.path.exists(day_file):
-                upload_to_drive(day_file)
-                print(f"📤 Uploaded: {day_file}")
-
-        # Fetch and update user data
-        users = fetch_users()
-        if users:
-            fetched_users = users
-            save_users_to_excel(users)
-            upload_to_drive(EXCEL_USERS_FILE)
-            print(f"📤 Uploaded: {EXCEL_USERS_FILE}")
+    cursor = prepare_ingest()
+
+    # Fetch + normalize: both endpoints in parallel, only visits newer than the cursor
+    visits_future = fetch_pool.submit(fetch_data, cursor)
+    users_future = fetch_pool.submit(fetch_users)
+    data = visits_future.result()
+    users = users_future.result()
+
+    if data:
+        full_history = not cursor["timestamp"]
+        # Persist first, so anything published is already on disk
+        save_to_excel(data)
+        save_fetch_cursor(advance_cursor(cursor, data))
+        metrics.inc("rows_ingested_total", len(data))
+        # Publish: swap in new immutable versions
+        if full_history:
+            # The payload overlaps what is loaded; rebuild from the deduplicated store
+            fetched_data = VisitTable.from_frame(visit_store.read_all())
+            rebuild_views()
+            announce(reload=True)
+        else:
+            fetched_data = fetched_data.extended(data)
+            publish_snapshot(new_visits=data, visits=fetched_data)
+            with rollups_lock:
+                if traffic_rollups is not None:
+                    traffic_rollups.add(data)
+            announce(data)
+        print(f"✅ Visitor data updated locally ({len(data)} new).")
+
+    if users:
+        # The API returns every user; only an actual change is written and uploaded
+        delta = diff_users(user_hashes, compact_users(users))
+        if delta:
+            records = apply_delta(fetched_users, delta)
+            save_users(records, delta)
+            fetched_users, user_hashes = records, delta.hashes
+            publish_snapshot(users=fetched_users)
+            announce()
+            metrics.inc("user_changes_total", len(delta.added), change="added")
+            metrics.inc("user_changes_total", len(delta.changed), change="changed")
+            metrics.inc("user_changes_total", len(delta.removed), change="removed")
+            print(f"👥 Users updated ({delta}).")
+
+
+scheduler = None
+scheduler_lock = threading.Lock()
+
+# Servers that load `app:app` directly get the jobs on their first request;
+# AUTOSTART_JOBS=0 keeps them off (tests, benchmarks, one-off scripts)
+AUTOSTART_JOBS = os.getenv("AUTOSTART_JOBS", "1") != "0"
+
+# Multi-worker mode (e.g. gunicorn -w 4 'app:create_app()'): the worker holding
+# LEADER_LOCK_FILE runs ingestion and the scheduled jobs and exports every new
+# snapshot to SHARED_SNAPSHOT_FILE; the other workers map that file and serve from it
+MULTI_WORKER = os.getenv("MULTI_WORKER", "0") == "1"
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", "ingest.lock")
+SHARED_SNAPSHOT_FILE = os.getenv("SHARED_SNAPSHOT_FILE", "shared_snapshot.bin")
+FOLLOWER_POLL_SECONDS = float(os.getenv("FOLLOWER_POLL_SECONDS", "2"))
+
+leader_lock = None
+shared_file = None
+exported_snapshot = None
+follower_thread = None
+
+
+def try_lead():
+    global leader_lock
+    if leader_lock is None:
+        from leader import LeaderLock
+        leader_lock = LeaderLock(LEADER_LOCK_FILE)
+    return leader_lock.try_acquire()
+
+
+def get_shared_file():
+    global shared_file
+    if shared_file is None:
+        from shared_snapshot import SnapshotFile
+        shared_file = SnapshotFile(SHARED_SNAPSHOT_FILE)
+    return shared_file
+
+
+def export_shared_snapshot():
+    # Leader: hand the current snapshot to the other workers, unless they already have it
+    global exported_snapshot
+    snapshot = get_snapshot()
+    if snapshot is not exported_snapshot:
+        with metrics.timed("snapshot_export"):
+            get_shared_file().write(snapshot.visits, snapshot.users, snapshot.agent_counts)
+        exported_snapshot = snapshot
+
+
+def refresh_from_leader():
+    """Follower: swap in the leader's latest exported snapshot. Returns True if there was one."""
+    global fetched_data, fetched_users, dashboard_snapshot, traffic_rollups
+    shared = get_shared_file().read_if_changed()
+    if shared is None:
+        return False
+    visit_store.refresh()  # the leader may have written new days
+    # rollups_lock first, so get_rollups never folds rows the tail below adds again
+    with rollups_lock:
+        with snapshot_lock:
+            fetched_data, fetched_users = shared.visits, shared.users
+            dashboard_snapshot = DashboardSnapshot(shared.visits, shared.users, shared.agent_counts)
+        if shared.appended_from is not None:
+            tail = [shared.visits[i] for i in range(shared.appended_from, len(shared.visits))]
+            if traffic_rollups is not None:
+                traffic_rollups.add(tail)
+        else:
+            tail = None
+            traffic_rollups = None  # rebuilt from the shared rows on next use
+    # This worker's /stream clients get the leader's batch too
+    announce(tail or (), reload=tail is None)
+    return True
 
+
+def follow_leader():
+    # Follower loop: pick up each exported snapshot; take over if the leader goes away
+    global fetched_data, fetched_users
+    while True:
+        try:
+            refresh_from_leader()
+        except Exception as e:
+            print(f"❌ Could not load shared snapshot: {e}")
+        if try_lead():
+            print("👑 Took over as ingest leader.")
+            # The mapped snapshot can lag what the old leader persisted: reload from disk
+            visit_store.refresh()
+            fetched_data = VisitTable.from_frame(visit_store.read_all())
+            fetched_users = ()
+            rebuild_views()
+            start_background_jobs()
+            return
+        time.sleep(FOLLOWER_POLL_SECONDS)
+
+
+def start_follower():
+    global follower_thread
+    if follower_thread is None:
+        follower_thread = threading.Thread(target=follow_leader, name="snapshot-follower", daemon=True)
+        follower_thread.start()
+        print("👀 Another worker leads ingestion; serving its shared snapshot.")
+
+
+def start_background_jobs():
+    """Start the fetch, report, export and compaction jobs. Idempotent; returns the scheduler.
+
+    In multi-worker mode only the leader starts them; other workers start
+    following its snapshot instead and get None.
+    """
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            if MULTI_WORKER and not try_lead():
+                start_follower()
+                return None
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            jobs = BackgroundScheduler()
+            jobs.add_job(continuous_fetch, 'interval', minutes=1, max_instances=1, coalesce=True)
+            jobs.add_job(send_daily_report, 'cron', hour=19, minute=30)
+            jobs.add_job(export_all_excel, 'cron', hour=2, minute=30)  # full history, for its Drive copy
+            jobs.add_job(visit_store.compact, 'cron', hour=3, minute=0)
+            jobs.add_job(backfill_reports, 'cron', hour=3, minute=30)  # picks up late visits
+            if MULTI_WORKER:
+                # Catch up and export right away instead of after the first interval
+                jobs.add_job(continuous_fetch)
+            jobs.start()
+            scheduler = jobs
+            print("⏰ Background jobs started.")
+    return scheduler
+
+
+def create_app(start_jobs=True):
+    """Application entry point, e.g. gunicorn 'app:create_app()'.
+
+    The index page's live feed (/stream) needs the ASGI entry point instead:
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT
+    """
+    if start_jobs:
+        start_background_jobs()
+    return app
+
+
+@app.before_request
+def ensure_background_jobs():
+    if scheduler is None and follower_thread is None and AUTOSTART_JOBS:
+        start_background_jobs()
+
+
+def download_from_drive(file_name):
+    """Refresh file_name from Drive if its content changed there. Returns True if downloaded."""
+    sync = get_drive_sync()
+    if sync is None:
+        print("❌ Google Drive not initialized.")
+        return False
+    try:
+        with file_lock(file_name):
+            downloaded = sync.download_if_changed(file_name)
+        if downloaded:
+            print(f"⬇️ Downloaded from Drive: {file_name}")
+            return True
     except Exception as e:
-        print(f"❌ Error during continuous fetch: {e}")
+        print(f"❌ Failed to download {file_name}: {e}")
+    return False
 
 
-from apscheduler.schedulers.background import BackgroundScheduler
+class DashboardSnapshot:
+    """Immutable view served by /dashboard. Replaced wholesale, never mutated."""
+    __slots__ = ("visits", "users", "total_visits", "total_users", "agent_counts", "device_counts",
+                 "built_at", "index")
 
-# Start the scheduler
-scheduler = BackgroundScheduler()
+    def __init__(self, visits, users, agent_counts, previous=None):
+        self.visits = visits
+        self.users = users
+        self.total_visits = len(visits)
+        self.total_users = len(users)
+        self.agent_counts = agent_counts  # device / browser / os breakdowns
+        self.device_counts = agent_counts["device"]
+        self.built_at = get_kolkata_time()
+        # Sort orders are built on first query; a snapshot that only appended rows extends the last one's
+        self.index = previous.index.extended(visits) if previous is not None else VisitIndex(visits)
 
-# Schedule tasks
-scheduler.add_job(continuous_fetch, 'interval', minutes=1, max_instances=1)
-scheduler.add_job(send_daily_report, 'cron', hour=19, minute=30)
 
-scheduler.start()
+dashboard_snapshot = None
+snapshot_lock = threading.Lock()  # serializes writers; readers just take the reference
 
 
-def download_from_drive(file_name):
-    try:
-        query = f"name='{file_name}' and trashed=false"
-        results = drive_service.files().list(q=query, fields="files(id)").execute()
-        files = results.get('files', [])
-        if not files:
-            print(f"⚠️ File not found on Drive: {file_name}")
+def build_snapshot():
+    # Local files only; the ingest tick refreshes them from Drive beforehand
+    visits = fetched_data
+    if not len(visits):
+        try:
+            visits = VisitTable.from_frame(visit_store.read_all())
+        except Exception as e:
+            print(f"❌ Could not read visit store: {e}")
+    # The one full count (cold start, full re-fetch); ticks fold their new visits in, see publish_snapshot
+    agent_counts = ua_classifier.summarize_counts(visits.value_counts("user_agent").items())
+
+    users = fetched_users
+    if not users:
+        df_users = visit_store.read_users() if STORAGE_BACKEND == "sqlite" else load_user_excel()
+        users = compact_users(df_users.to_dict(orient='records')) if df_users is not None else ()
+
+    return DashboardSnapshot(visits, users, agent_counts)
+
+
+def get_snapshot():
+    global dashboard_snapshot
+    if dashboard_snapshot is None:
+        with snapshot_lock:
+            if dashboard_snapshot is None:
+                dashboard_snapshot = build_snapshot()
+    return dashboard_snapshot
+
+
+def publish_snapshot(new_visits=None, users=None, visits=None):
+    """Fold a fetch tick into the snapshot: O(new visits), no disk or network.
+
+    visits, if given, is a VisitTable that already includes new_visits.
+    """
+    global dashboard_snapshot
+    with snapshot_lock:
+        current = dashboard_snapshot
+        if current is None:
+            dashboard_snapshot = build_snapshot()
             return
+        agent_counts = current.agent_counts
+        if visits is None:
+            visits = current.visits.extended(new_visits) if new_visits else current.visits
+        if new_visits:
+            added = ua_classifier.summarize(v.get("user_agent", "") for v in new_visits)
+            agent_counts = ua_classifier.merge_counts(agent_counts, added)
+        dashboard_snapshot = DashboardSnapshot(
+            visits, users if users is not None else current.users, agent_counts, previous=current
+        )
 
-        file_id = files[0]['id']
-        request = drive_service.files().get_media(fileId=file_id)
-        fh = io.FileIO(file_name, 'wb')
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        print(f"⬇️ Downloaded from Drive: {file_name}")
-    except Exception as e:
-        print(f"❌ Failed to download {file_name}: {e}")
+
+def rebuild_views():
+    # Recompute the snapshot and rollups from scratch, e.g. after a full re-fetch
+    global dashboard_snapshot, traffic_rollups
+    with snapshot_lock:
+        dashboard_snapshot = build_snapshot()
+    with rollups_lock:
+        rollups = TrafficRollups()
+        rollups.add_frame(visit_store.read_all())
+        traffic_rollups = rollups
+
+
+traffic_rollups = None
+rollups_lock = threading.Lock()
+
+# Live feed for /stream: each tick's new visits and counters, pushed to open index pages
+feed = live_feed.Broker(buffer_size=int(os.getenv("STREAM_BUFFER", "100")))
+STREAM_MAX_ROWS = 500  # bigger batches (e.g. a full re-fetch) tell pages to reload instead
+
+
+def announce(new_visits=(), reload=False):
+    """Push the published snapshot's counters, plus new_visits, to /stream clients."""
+    if not len(feed):
+        return
+    snapshot = get_snapshot()
+    payload = {
+        "total_visits": snapshot.total_visits,
+        "total_users": snapshot.total_users,
+        "device_counts": snapshot.device_counts,
+    }
+    if reload or len(new_visits) > STREAM_MAX_ROWS:
+        payload["reload"] = True
+    else:
+        payload["visits"] = [{c: str(v.get(c, "")) for c in VISIT_COLUMNS} for v in new_visits]
+    feed.publish("update", payload)
+
+
+def get_rollups():
+    # Built once from the store, then kept current by continuous_fetch
+    global traffic_rollups
+    if traffic_rollups is None:
+        with rollups_lock:
+            if traffic_rollups is None:
+                rollups = TrafficRollups()
+                if follower_thread is not None and scheduler is None:
+                    # Follower: fold exactly the shared rows, so appended tails line up
+                    rollups.add_frame(fetched_data.to_frame())
+                else:
+                    rollups.add_frame(visit_store.read_all())
+                traffic_rollups = rollups
+    return traffic_rollups
 
 
 @app.route("/dashboard")
@@ -357,57 +1001,67 @@ def dashboard():
     if "user" not in session:
         return redirect(url_for("login"))
 
-    # ✅ Sync latest files from Google Drive
-    download_from_drive("visitor_data.xlsx")
-    download_from_drive("user_data.xlsx")
+    # ✅ Served from memory; the fetch job keeps the snapshot current
+    snapshot = get_snapshot()
 
-    # ✅ Load visitors from Excel
-    visits = []
-    if os.path.exists(EXCEL_ALL_FILE):
-        try:
-            visits = pd.read_excel(EXCEL_ALL_FILE).to_dict(orient='records')
-        except Exception as e:
-            print(f"❌ Could not read visitor file: {e}")
+    today_date = datetime.now(pytz.timezone("Asia/Kolkata")).strftime('%Y-%m-%d')
+    with metrics.timed("template_render", template="dashboard.html"):
+        return render_template(
+            "dashboard.html",
+            total_visits=snapshot.total_visits,
+            total_users=snapshot.total_users,
+            device_counts=snapshot.device_counts,
+            browser_counts=snapshot.agent_counts["browser"],
+            os_counts=snapshot.agent_counts["os"],
+            current_time=get_kolkata_time(),
+            today_date=today_date  # 👈 ADD THIS
+        )
 
-    # ✅ Load users from Excel
-    users = []
-    if os.path.exists(EXCEL_USERS_FILE):
-        try:
-            users = pd.read_excel(EXCEL_USERS_FILE).to_dict(orient='records')
-        except Exception as e:
-            print(f"❌ Could not read user file: {e}")
-
-    total_visits = len(visits)
-    total_users = len(users)
-
-    # ✅ Device type breakdown
-    device_counts = {"Desktop": 0, "Mobile": 0, "Other": 0}
-    for visit in visits:
-        agent = str(visit.get("user_agent", "")).lower()
-        if "mobile" in agent:
-            device_counts["Mobile"] += 1
-        elif "windows" in agent or "macintosh" in agent or "linux" in agent:
-            device_counts["Desktop"] += 1
-        else:
-            device_counts["Other"] += 1
 
-    today_date = datetime.now(pytz.timezone("Asia/Kolkata")).strftime('%Y-%m-%d')
-    return render_template(
-        "dashboard.html",
-        data=visits,
-        total_visits=total_visits,
-        total_users=total_users,
-        device_counts=device_counts,
-        current_time=get_kolkata_time(),
-        today_date=today_date  # 👈 ADD THIS
-    )
+@app.route("/api/visits")
+def api_visits():
+    # DataTables server-side processing: paging, sorting and filtering happen here
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    try:
+        return jsonify(datatables_query(get_snapshot().index, request.args))
+    except ValueError as e:
+        return jsonify({"error": f"Bad query: {e}"}), 400
+
 
+@app.route("/api/stats/daily")
+def api_stats_daily():
+    # Per-day visits, unique emails/IPs and device mix for charts; ?from=YYYY-MM-DD&to=YYYY-MM-DD
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    return jsonify(get_rollups().daily(request.args.get("from"), request.args.get("to")))
+
+
+@app.route("/api/stats/hourly")
+def api_stats_hourly():
+    # 24 hourly buckets for ?date=YYYY-MM-DD (defaults to today)
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    day = request.args.get("date") or datetime.now(pytz.timezone("Asia/Kolkata")).strftime('%Y-%m-%d')
+    return jsonify({"date": day, "hours": get_rollups().hourly(day)})
+
+
+
+def load_visits_excel():
+    try:
+        if os.path.exists(EXCEL_ALL_FILE):
+            with metrics.timed("excel_read"):
+                return pd.read_excel(EXCEL_ALL_FILE).fillna("").astype(str).to_dict(orient='records')
+    except Exception as e:
+        print(f"❌ Could not read visitor file: {e}")
+    return []
 
 
 def load_user_excel():
     try:
         if os.path.exists(EXCEL_USERS_FILE):
-            return pd.read_excel(EXCEL_USERS_FILE)
+            with metrics.timed("excel_read"):
+                return pd.read_excel(EXCEL_USERS_FILE)
     except Exception as e:
         print(f"❌ Could not read user file: {e}")
     return None
@@ -423,34 +1077,17 @@ def index():
     if "user" not in session:
         return redirect(url_for("login"))
 
-    # 🧮 Count total visits
-    total_visits = len(fetched_data)
-
-    # 📱 Device breakdown
-    device_counts = {"Desktop": 0, "Mobile": 0, "Other": 0}
-    for visit in fetched_data:
-        agent = visit.get("user_agent", "").lower()
-        if "mobile" in agent:
-            device_counts["Mobile"] += 1
-        elif "windows" in agent or "macintosh" in agent or "linux" in agent:
-            device_counts["Desktop"] += 1
-        else:
-            device_counts["Other"] += 1
-
-    # ✅ Convert timestamps to strings (if needed)
-    for visit in fetched_data:
-        ts = visit.get("timestamp")
-        if isinstance(ts, datetime):
-            visit["timestamp"] = ts.strftime("%Y-%m-%d %H:%M:%S")
+    # 📱 Counters and device breakdown come with the published snapshot
+    snapshot = get_snapshot()
 
-    return render_template("index.html", 
-        data=fetched_data,
-        total_visits=total_visits,
-        total_users=len(fetched_users),
-        device_counts=device_counts,
-        current_time=get_kolkata_time(),
-        today_date=datetime.now().strftime("%Y-%m-%d")  # ✅ Add this
-    )
+    with metrics.timed("template_render", template="index.html"):
+        return render_template("index.html", 
+            total_visits=snapshot.total_visits,
+            total_users=snapshot.total_users,
+            device_counts=snapshot.device_counts,
+            current_time=get_kolkata_time(),
+            today_date=datetime.now().strftime("%Y-%m-%d")  # ✅ Add this
+        )
 
 
 
@@ -477,30 +1114,28 @@ def download_excel():
     if "user" not in session:
         return redirect(url_for("login"))
 
+    # Available days come from the store's in-memory partition index
+    available = visit_store.days()
+
     if request.method == "POST":
-        year = request.form.get("year")
-        month = request.form.get("month")
-        day = request.form.get("day")
-        file_path = os.path.join(DATA_FOLDER, year, month, f"{day}.xlsx")
+        date_from = request.form.get("date_from", "")
+        date_to = request.form.get("date_to", "") or date_from
+        fmt = request.form.get("format", "csv")
+        try:
+            datetime.strptime(date_from, "%Y-%m-%d")
+            datetime.strptime(date_to, "%Y-%m-%d")
+        except ValueError:
+            flash("Please pick a valid date range", "warning")
+            return redirect(url_for("download_excel"))
+        if date_from > date_to:
+            date_from, date_to = date_to, date_from
 
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            flash("No data found for selected date", "warning")
+        if not visit_store.days(date_from, date_to):
+            flash("No data found for selected dates", "warning")
             return redirect(url_for("download_excel"))
 
-    # Collect year/month/day options
-    years = sorted(os.listdir(DATA_FOLDER)) if os.path.exists(DATA_FOLDER) else []
-    months = []
-    days = []
-    if years:
-        months_path = os.path.join(DATA_FOLDER, years[-1])
-        if os.path.exists(months_path):
-            months = sorted(os.listdir(months_path))
-            if months:
-                days_path = os.path.join(months_path, months[-1])
-                if os.path.exists(days_path):
-                    days = [f.replace(".xlsx", "") for f in os.listdir(days_path)]
+        return stream_export(visit_store.iter_batches(date_from, date_to), VISIT_COLUMNS,
+                             fmt, f"visitors_{date_from}_to_{date_to}")
 
     return render_template_string("""
     <!DOCTYPE html>
@@ -520,33 +1155,30 @@ def download_excel():
           {% endif %}
         {% endwith %}
         <form method="POST" class="border p-4 bg-white shadow-sm rounded">
+          <p class="text-muted">
+            {% if days %}Data available for {{ days|length }} day(s), {{ days[0] }} to {{ days[-1] }}.
+            {% else %}No visitor data stored yet.{% endif %}
+          </p>
           <div class="row mb-3">
             <div class="col-md-4">
-              <label>Year</label>
-              <select name="year" class="form-select" required>
-                {% for y in years %}
-                  <option value="{{ y }}">{{ y }}</option>
-                {% endfor %}
-              </select>
+              <label>From</label>
+              <input type="date" name="date_from" class="form-control" required
+                     value="{{ days[-1] if days else '' }}" min="{{ days[0] if days else '' }}" max="{{ days[-1] if days else '' }}">
             </div>
             <div class="col-md-4">
-              <label>Month</label>
-              <select name="month" class="form-select" required>
-                {% for m in months %}
-                  <option value="{{ m }}">{{ m }}</option>
-                {% endfor %}
-              </select>
+              <label>To</label>
+              <input type="date" name="date_to" class="form-control"
+                     value="{{ days[-1] if days else '' }}" min="{{ days[0] if days else '' }}" max="{{ days[-1] if days else '' }}">
             </div>
             <div class="col-md-4">
-              <label>Day</label>
-              <select name="day" class="form-select" required>
-                {% for d in days %}
-                  <option value="{{ d }}">{{ d }}</option>
-                {% endfor %}
+              <label>Format</label>
+              <select name="format" class="form-select">
+                <option value="csv">CSV</option>
+                <option value="xlsx">Excel (.xlsx, slow for long ranges)</option>
               </select>
             </div>
           </div>
-          <button type="submit" class="btn btn-primary">Download Excel</button>
+          <button type="submit" class="btn btn-primary">Download</button>
           <a href="/" class="btn btn-secondary ms-2">Back to Dashboard</a>
         </form>
 
@@ -555,76 +1187,169 @@ def download_excel():
       </div>
     </body>
     </html>
-    """, years=years, months=months, days=days)
+    """, days=available)
 
 FOLDER_ID = "1BrpKgvd2i5LSM7lmRbfb4KTyaC78gwXc"  # Your visitor_logs folder ID
 
-def file_checksum(path):
-    with open(path, 'rb') as f:
-        return hashlib.md5(f.read()).hexdigest()
+drive_sync = None
+drive_ready = False
+drive_lock = threading.Lock()
+
+
+def get_drive_sync():
+    """DriveSync for FOLDER_ID, or None. Credentials and the client are set up on first call."""
+    global drive_sync, drive_ready
+    if not drive_ready:
+        with drive_lock:
+            if not drive_ready:
+                write_client_secrets()
+                service = init_drive()
+                if service:
+                    from drive_sync import DriveSync
+                    # Persisted file index, so unchanged files cost no Drive calls even after a restart
+                    drive_sync = DriveSync(service, FOLDER_ID, DRIVE_INDEX_FILE)
+                drive_ready = True
+    return drive_sync
+
+def upload_file_now(file_path):
+    # Runs on an upload worker; errors propagate so the queue can back off and retry
+    if not os.path.isfile(file_path):
+        print(f"❌ File not found: {file_path}")
+        return
+
+    sync = get_drive_sync()
+    if sync.upload(file_path):
+        metrics.inc("uploads_total", result="uploaded")
+        print(f"✅ Uploaded: {file_path} (ID: {sync.entry(os.path.basename(file_path))['id']})")
+    else:
+        metrics.inc("uploads_total", result="skipped")
+        print(f"🔁 Skipped (unchanged): {file_path}")
+
 
-last_uploaded_checksums = {}
+upload_queue = UploadQueue(upload_file_now, workers=2)
 
 def upload_to_drive(file_path):
-    if drive_service is None:
+    # Non-blocking: the scheduler tick never waits on Drive
+    if get_drive_sync() is None:
         print("❌ Google Drive not initialized.")
         return
-
+    upload_queue.submit(file_path)
+
+
+
+
+# Observability: per-request timing, optional profiling, Prometheus scrape endpoint
+# If set, /metrics requires ?token= or a Bearer header; if not, only local scrapers get it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+LOCAL_ADDRS = ("127.0.0.1", "::1")
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS") == "1"  # enables ?profile=1 for logged-in users
+profile_lock = threading.Lock()  # the profiler hooks are process-wide: one profiled request at a time
+
+metrics.gauge("visits_in_memory", lambda: len(fetched_data), "Visits held in the in-memory table")
+metrics.gauge("upload_queue_pending", lambda: len(upload_queue.pending()), "Drive uploads queued or in flight")
+metrics.gauge("store_days", lambda: len(visit_store.days()), "Days in the visit store")
+metrics.gauge("stream_clients", lambda: len(feed), "Open /stream connections")
+metrics.gauge("ingest_leader", lambda: int(scheduler is not None), "1 if this worker runs ingestion")
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    if PROFILE_REQUESTS and request.args.get("profile") == "1" and "user" in session:
+        if profile_lock.acquire(blocking=False):
+            import cProfile
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        # Streamed bodies are produced after this point and are not in the profile
+        profiler.disable()
+        profile_lock.release()
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        response = Response(out.getvalue(), mimetype="text/plain")
+
+    endpoint = request.endpoint or "unmatched"
+    metrics.observe("request_seconds", time.perf_counter() - g.get("request_start", time.perf_counter()),
+                    endpoint=endpoint)
+    metrics.inc("requests_total", endpoint=endpoint, status=response.status_code)
+    if response.content_length:
+        metrics.inc("bytes_total", response.content_length, direction="served")
+    return response
+
+
+@app.teardown_request
+def stop_request_profiler(exc=None):
+    # after_request is skipped when a view raises; don't leave the profiler running
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        profile_lock.release()
+
+
+@app.route("/report/<day>")
+def report(day):
+    if "user" not in session:
+        return redirect(url_for("login"))
     try:
-        if not os.path.isfile(file_path):
-            print(f"❌ File not found: {file_path}")
-            return
-
-        file_name = os.path.basename(file_path)
-        current_checksum = file_checksum(file_path)
-
-        # Skip if file content hasn't changed
-        if last_uploaded_checksums.get(file_name) == current_checksum:
-            print(f"🔁 Skipped (unchanged): {file_path}")
-            return
-
-        # Search for the file in the specific folder only
-        query = f"'{FOLDER_ID}' in parents and name='{file_name}' and trashed=false"
-        response = drive_service.files().list(q=query, fields="files(id)").execute()
-        files = response.get('files', [])
-        media = MediaFileUpload(file_path, resumable=True)
-
-        if files:
-            # Update existing file
-            file_id = files[0]['id']
-            drive_service.files().update(fileId=file_id, media_body=media).execute()
-            print(f"♻️ Updated: {file_path} (ID: {file_id})")
-        else:
-            # Upload new file to specified folder
-            uploaded = drive_service.files().create(
-                body={'name': file_name, 'parents': [FOLDER_ID]},
-                media_body=media,
-                fields='id'
-            ).execute()
-            print(f"✅ Uploaded: {file_path} (ID: {uploaded.get('id')})")
-
-        last_uploaded_checksums[file_name] = current_checksum
-
-    except Exception as e:
-        print(f"❌ Upload to Drive failed: {e}")
+        datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        return "Date must be YYYY-MM-DD", 400
+    today = datetime.now(pytz.timezone("Asia/Kolkata")).strftime("%Y-%m-%d")
+    if day != today and day not in visit_store.days(day, day):
+        return f"No visits stored for {day}", 404
+    path = get_daily_report(day)
+    return send_file(os.path.abspath(path), mimetype=XLSX_MIMETYPE, as_attachment=True,
+                     download_name=os.path.basename(path))
+
+
+@app.cli.command("backfill-reports")
+@click.option("--from", "date_from", help="first day, YYYY-MM-DD (default: oldest stored)")
+@click.option("--to", "date_to", help="last day, YYYY-MM-DD (default: newest stored)")
+def backfill_reports_command(date_from, date_to):
+    """Build cached daily reports for past dates: flask --app app backfill-reports"""
+    backfill_reports(date_from, date_to)
+
+
+@app.route("/stream")
+def stream():
+    # The SSE feed is served by asgi.py (uvicorn asgi:application), where an open page is
+    # a coroutine; under WSGI it would pin a worker per tab. 204 tells EventSource not to
+    # reconnect, and the index page falls back to refreshing itself every minute.
+    if "user" not in session:
+        return "Unauthorized", 401
+    return "", 204
 
 
+@app.route("/metrics")
+def metrics_endpoint():
+    if METRICS_TOKEN:
+        supplied = request.args.get("token") or request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if supplied != METRICS_TOKEN:
+            return "Forbidden", 403
+    # A request relayed by a reverse proxy on this host is not local
+    elif request.remote_addr not in LOCAL_ADDRS or "X-Forwarded-For" in request.headers:
+        return "Forbidden", 403
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/download-all")
 def download_all():
     if "user" not in session:
         return redirect(url_for("login"))
-    if os.path.exists(EXCEL_ALL_FILE):
-        return send_file(EXCEL_ALL_FILE, as_attachment=True)
-    return "File not found", 404
-
-
-# Start background fetch thread
-# Schedule continuous fetch every 1 minute instead of using threading
-scheduler.add_job(continuous_fetch, 'interval', minutes=1)
+    if visit_store.is_empty():
+        return "File not found", 404
+    # Streamed from the store in bounded batches; ?format=csv|ndjson|xlsx, csv by default:
+    # the full history as xlsx takes longer to build than a worker's request timeout
+    return stream_export(visit_store.iter_batches(), VISIT_COLUMNS,
+                         request.args.get("format", "csv"), "visitor_data")
 
 
 if __name__ == "__main__":
-    app.run(debug=True, use_reloader=False)
+    create_app().run(debug=True, use_reloader=False)
 
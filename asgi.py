@@ -0,0 +1,102 @@
+"""ASGI entry point: /stream on the event loop, every other route through Flask.
+
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT
+
+This is the entry point to deploy with when the index page should update
+live. Under a WSGI server each /stream client would park a worker thread
+for as long as its page is open, so Flask's own /stream answers 204 and
+pages fall back to a timed refresh. Here a client is a coroutine waiting
+on the live feed, so hundreds of idle index pages cost a few KB each; the
+rest of the app runs unchanged on asgiref's thread pool. Background jobs
+start with the server (lifespan) unless AUTOSTART_JOBS=0; MULTI_WORKER=1
+works with uvicorn --workers N as with gunicorn.
+"""
+import asyncio
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_app
+import live_feed
+
+
+wsgi_application = WsgiToAsgi(flask_app.app)
+
+STREAM_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+def logged_in(scope):
+    # Same check as the Flask views: a valid signed session cookie holding "user"
+    app = flask_app.app
+    cookies = SimpleCookie()
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    morsel = cookies.get(app.config["SESSION_COOKIE_NAME"])
+    serializer = app.session_interface.get_signing_serializer(app)
+    if morsel is None or serializer is None:
+        return False
+    try:
+        data = serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return False
+    return "user" in data
+
+
+async def stream(scope, receive, send, keepalive=15):
+    if not logged_in(scope):
+        await send({"type": "http.response.start", "status": 401, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"Unauthorized"})
+        return
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    # publish() runs on the ingest thread; hop onto the loop to wake this client
+    subscription = flask_app.feed.subscribe(lambda: loop.call_soon_threadsafe(wake.set))
+
+    async def wait_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    gone = asyncio.ensure_future(wait_disconnect())
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": STREAM_HEADERS})
+        await send({"type": "http.response.body", "body": f"retry: {live_feed.RETRY_MS}\n\n".encode(),
+                    "more_body": True})
+        while True:
+            woken = asyncio.ensure_future(wake.wait())
+            await asyncio.wait({woken, gone}, timeout=keepalive, return_when=asyncio.FIRST_COMPLETED)
+            woken.cancel()
+            if gone.done():
+                return
+            wake.clear()
+            chunk = subscription.drain() or live_feed.KEEPALIVE
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    finally:
+        gone.cancel()
+        flask_app.feed.unsubscribe(subscription)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if flask_app.AUTOSTART_JOBS:
+                flask_app.start_background_jobs()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/stream":
+        await stream(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,55 @@
+"""Per-tick cost of writing the date-wise visitor logs.
+
+Compares the old per-visit loop (one read + rewrite of the day file per
+visit) with write_daily_logs (one merge + write per day file).
+
+    python -m benchmarks.bench_daily_logs [N ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def legacy_write_daily_logs(app, data):
+    pd = app.pd
+    for item in data:
+        path = app.daily_log_path(item["timestamp"][:10])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df_day = pd.DataFrame([item])
+        if os.path.exists(path) and app.is_valid_excel(path):
+            df_existing = pd.read_excel(path)
+            df_day = pd.concat([df_existing, df_day], ignore_index=True).drop_duplicates()
+        app.safe_write_excel(df_day, path)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    from testing.synthetic import make_visits
+
+    workdir = tempfile.mkdtemp(prefix="bench_daily_logs_")
+    os.chdir(workdir)
+    import app
+    app.DATA_FOLDER = os.path.join(workdir, "warmup")
+    app.write_daily_logs(make_visits(1))  # load pandas/openpyxl before timing anything
+
+    print(f"{'visits':>8} {'legacy (s)':>12} {'batched (s)':>12} {'speedup':>8}")
+    for n in sizes:
+        rows = make_visits(n, days=1)
+        app.DATA_FOLDER = os.path.join(workdir, f"legacy_{n}")
+        legacy = timed(legacy_write_daily_logs, app, rows)
+        app.DATA_FOLDER = os.path.join(workdir, f"batched_{n}")
+        batched = timed(app.write_daily_logs, rows)
+        print(f"{n:>8} {legacy:>12.3f} {batched:>12.3f} {legacy / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10, 50, 100, 200])
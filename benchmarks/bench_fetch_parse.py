@@ -0,0 +1,77 @@
+"""Throughput of turning an /admin/visits payload into clean visit rows.
+
+Compares the old per-record loop (fromisoformat/astimezone/strftime and a
+tuple set per visit) with the vectorized normalize_visits, both fed by
+the same streaming JSON parse of the response body.
+
+    python -m benchmarks.bench_fetch_parse [N ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+class FakeResponse:
+    def __init__(self, body, chunk_size=64 * 1024):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), self.chunk_size):
+            yield self.body[i:i + self.chunk_size]
+
+
+def legacy_normalize(records):
+    import pytz
+    ist = pytz.timezone('Asia/Kolkata')
+    cleaned = []
+    seen = set()
+    for d in records:
+        raw_ts = d['timestamp']
+        if 'T' in raw_ts:
+            utc_dt = datetime.fromisoformat(raw_ts.replace("Z", "+00:00"))
+        else:
+            utc_dt = datetime.strptime(raw_ts, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        formatted_ts = utc_dt.astimezone(ist).strftime('%Y-%m-%d %H:%M:%S')
+        key = (d.get("email", "Guest"), d.get("ip", ""), formatted_ts, d.get("user_agent", ""))
+        if key not in seen:
+            seen.add(key)
+            cleaned.append({"email": key[0], "ip": key[1], "timestamp": key[2], "user_agent": key[3]})
+    return cleaned
+
+
+def main(sizes):
+    from testing.synthetic import make_raw_visits
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_fetch_parse_"))
+    import app
+    app.normalize_visits(make_raw_visits(10))  # load pandas before timing anything
+
+    print(f"{'records':>9} {'parse (s)':>10} {'legacy (s)':>11} {'vectorized (s)':>15} {'legacy rec/s':>13} {'vector rec/s':>13}")
+    for n in sizes:
+        body = json.dumps(make_raw_visits(n, days=30)).encode()
+
+        start = time.perf_counter()
+        records = list(app.iter_json_array(FakeResponse(body)))
+        parse = time.perf_counter() - start
+
+        start = time.perf_counter()
+        old_rows = legacy_normalize(records)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_rows = app.normalize_visits(records)
+        vectorized = time.perf_counter() - start
+
+        assert len(old_rows) == len(new_rows)
+        print(f"{n:>9} {parse:>10.3f} {legacy:>11.3f} {vectorized:>15.3f} {n / legacy:>13,.0f} {n / vectorized:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 250_000])
@@ -0,0 +1,58 @@
+"""Startup cost: time to `import app` in a fresh interpreter, and what it loaded.
+
+Each run is a new process in an empty working directory, so nothing is
+cached in memory. Also reports which heavy dependencies were imported
+and the cost of the first request that needs pandas.
+
+    python -m benchmarks.bench_import [RUNS]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "openpyxl", "googleapiclient", "google.oauth2",
+                 "pydrive", "apscheduler", "flask_mail", "requests"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+loaded = [m for m in %r if m in sys.modules]
+start = time.perf_counter()
+app.visit_store.read_all()
+first_use = time.perf_counter() - start
+print(json.dumps({
+    "import_s": imported,
+    "first_store_read_s": first_use,
+    "scheduler_started": app.scheduler is not None,
+    "loaded": loaded,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, AUTOSTART_JOBS="0")
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=tempfile.mkdtemp(prefix="bench_import_"),
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(runs):
+    results = [run_once() for _ in range(runs)]
+    import_times = [r["import_s"] for r in results]
+    first_use = [r["first_store_read_s"] for r in results]
+    print(f"import app      median {statistics.median(import_times) * 1000:8.1f} ms  "
+          f"(min {min(import_times) * 1000:.1f}, max {max(import_times) * 1000:.1f}, {runs} runs)")
+    print(f"first pandas use median {statistics.median(first_use) * 1000:7.1f} ms")
+    print(f"scheduler started at import: {results[0]['scheduler_started']}")
+    print(f"heavy modules loaded at import: {', '.join(results[0]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,59 @@
+"""Resident size of the in-process visit history: list of dicts vs VisitTable.
+
+The list of dicts is rebuilt through a JSON round trip, so every row owns
+its own strings exactly as the fetched payload did. Sizes are what
+tracemalloc still sees allocated once each structure is built.
+
+    python -m benchmarks.bench_memory [N ...]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def retained(build):
+    """(object, bytes still allocated after build(), peak bytes during it)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak
+
+
+def main(sizes):
+    import pandas as pd
+
+    from testing.synthetic import make_visits
+    from compact import VisitTable
+
+    print(f"{'visits':>9} {'dicts (MB)':>11} {'table (MB)':>11} {'ratio':>6} {'build peak (MB)':>16} {'extend 100 (ms)':>16}")
+    for n in sizes:
+        payload = json.dumps(make_visits(n, days=30))
+        frame = pd.DataFrame(json.loads(payload))
+
+        rows, dict_bytes, _ = retained(lambda: json.loads(payload))
+        del rows
+        table, table_bytes, table_peak = retained(lambda: VisitTable.from_frame(frame))
+
+        batch = make_visits(100, start="2025-08-01", seed=1)
+        start = time.perf_counter()
+        newer = table.extended(batch)
+        extend_ms = (time.perf_counter() - start) * 1000
+        assert len(newer) == n + 100 and len(table) == n
+        assert newer[n] == batch[0] and table[0] == frame.iloc[0].to_dict()
+
+        mb = 1024 * 1024
+        print(f"{n:>9} {dict_bytes / mb:>11.1f} {table_bytes / mb:>11.1f} {dict_bytes / table_bytes:>5.1f}x "
+              f"{table_peak / mb:>16.1f} {extend_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 500_000])
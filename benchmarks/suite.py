@@ -0,0 +1,237 @@
+"""End-to-end benchmark suite: ingestion, persistence, Drive sync and dashboard.
+
+For each dataset size it starts from an empty working directory, serves
+synthetic visits from the local stub API, points the Drive code at the
+in-memory fake service, and times each stage of a full-history tick:
+
+    fetch           fetch_data() over HTTP (stream parse + normalize)
+    fetch_304       the same request again, answered 304 by the stub
+    save_to_excel   visit store append + per-day Excel logs
+    export_excel    safe_write_excel() of the whole history
+    export_skip     the same export again (fingerprint says unchanged)
+    upload          upload_to_drive() for every written file, until drained
+    snapshot        cold start: load the store into memory, build the dashboard view
+    GET /dashboard, GET /, GET /api/visits   repeated requests
+
+Each stage reports latency, throughput and the process peak RSS after it.
+With --tracemalloc, stages also report their peak Python allocations.
+That slows the timings, so compare like with like.
+
+    python -m benchmarks                      # 1k and 100k rows
+    python -m benchmarks --sizes 1k,100k,1m --json results.json
+    python -m benchmarks --compare before.json --json after.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("AUTOSTART_JOBS", "0")
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Recorder:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def stage(self, name, rows, fn, *args):
+        """Run fn(*args) once as stage `name`; returns its result."""
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        record = {"stage": name, "rows": rows, "seconds": elapsed,
+                  "rows_per_s": rows / elapsed if elapsed and rows else None,
+                  "peak_rss_mb": peak_rss_mb()}
+        if self.trace_memory:
+            record["peak_alloc_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        self.stages.append(record)
+        return result
+
+    def requests(self, name, client, path, repeat):
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, (path, response.status_code)
+        latencies.sort()
+        self.stages.append({
+            "stage": name, "requests": repeat, "seconds": sum(latencies),
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+            "requests_per_s": repeat / sum(latencies),
+            "peak_rss_mb": peak_rss_mb(),
+        })
+
+
+def run_size(app, n, recorder, repeat, drive_latency=0.0):
+    from testing.app_state import reset_app
+    from testing.stub_api import StubAPI
+    from testing.synthetic import make_raw_visits
+
+    workdir = tempfile.mkdtemp(prefix=f"bench_suite_{n}_")
+    drive = reset_app(app, workdir, drive_latency)
+    users = [{"email": f"user{i}@example.com", "name": f"User {i}", "phone": "", "role": "user",
+              "created_at": "2025-07-01 00:00:00"} for i in range(max(1, n // 50))]
+    stub = StubAPI(make_raw_visits(n, days=30), users).start()
+    app.DATA_URL = stub.url("/admin/visits")
+    app.USER_DATA_URL = stub.url("/admin/users")
+    try:
+        empty_cursor = {"timestamp": "", "keys": set()}
+        rows = recorder.stage("fetch", n, app.fetch_data, empty_cursor)
+        assert len(rows) == n, f"fetched {len(rows)} of {n}"
+        # Revalidate the same query: marked processed only once it was persisted in production
+        app.http_client.mark_processed(app.http_client.get(app.DATA_URL))
+        recorder.stage("fetch_304", 0, app.fetch_data, empty_cursor)
+
+        # Hold uploads back so Drive time is measured in its own stage
+        queued, upload_to_drive = [], app.upload_to_drive
+        app.upload_to_drive = queued.append
+        try:
+            recorder.stage("save_to_excel", n, app.save_to_excel, rows)
+            recorder.stage("export_excel", n, app.safe_write_excel, app.visit_store.read_all(), app.EXCEL_ALL_FILE)
+            recorder.stage("export_skip", n, app.safe_write_excel, app.visit_store.read_all(), app.EXCEL_ALL_FILE)
+        finally:
+            app.upload_to_drive = upload_to_drive
+
+        def upload_all():
+            for path in dict.fromkeys(queued + [app.EXCEL_ALL_FILE]):
+                app.upload_to_drive(path)
+            app.upload_queue.join()
+        recorder.stage("upload", 0, upload_all)
+        recorder.stages[-1]["drive_calls"] = dict(drive.calls)
+
+        def cold_snapshot():
+            # What a restart pays: load the store into memory, then build the view
+            app.fetched_data = app.VisitTable.from_frame(app.visit_store.read_all())
+            app.fetched_users = app.compact_users(users)
+            return app.get_snapshot()
+        recorder.stage("snapshot", n, cold_snapshot)
+
+        client = app.app.test_client()
+        with client.session_transaction() as session:
+            session["user"] = "bench"
+        recorder.requests("GET /dashboard", client, "/dashboard", repeat)
+        recorder.requests("GET /", client, "/", repeat)
+        recorder.requests("GET /api/visits", client,
+                          "/api/visits?draw=1&start=0&length=25&order[0][column]=2"
+                          "&columns[2][data]=timestamp&order[0][dir]=desc", repeat)
+    finally:
+        stub.stop()
+        os.chdir(REPO_ROOT)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    base = {}
+    for size in (baseline or {}).get("sizes", []):
+        for stage in size["stages"]:
+            base[(size["rows"], stage["stage"])] = stage["seconds"]
+
+    for size in results["sizes"]:
+        print(f"\n== {size['rows']:,} visits")
+        print(f"{'stage':<18} {'seconds':>9} {'rows/s':>12} {'p50 ms':>8} {'p95 ms':>8} {'rss MB':>8}"
+              + (f" {'alloc MB':>9}" if results["tracemalloc"] else "")
+              + (f" {'vs base':>8}" if baseline else ""))
+        for s in size["stages"]:
+            line = (f"{s['stage']:<18} {s['seconds']:>9.3f} "
+                    f"{(format(s['rows_per_s'], ',.0f') if s.get('rows_per_s') else '-'):>12} "
+                    f"{(format(s['p50_ms'], '.1f') if 'p50_ms' in s else '-'):>8} "
+                    f"{(format(s['p95_ms'], '.1f') if 'p95_ms' in s else '-'):>8} "
+                    f"{s['peak_rss_mb']:>8.0f}")
+            if results["tracemalloc"]:
+                line += f" {s.get('peak_alloc_mb', 0):>9.1f}"
+            if baseline:
+                old = base.get((size["rows"], s["stage"]))
+                line += f" {(format(s['seconds'] / old, '.2f') + 'x') if old else '-':>8}"
+            print(line)
+
+
+def run_all(args):
+    import app
+
+    # Warm-up pass: first-use imports and caches should not land in the first size
+    run_size(app, 100, Recorder(), 1)
+
+    results = {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tracemalloc": args.tracemalloc,
+        "drive_latency": args.drive_latency,
+        "sizes": [],
+    }
+    for n in (parse_size(s) for s in args.sizes.split(",")):
+        recorder = Recorder(trace_memory=args.tracemalloc)
+        run_size(app, n, recorder, args.repeat, args.drive_latency)
+        results["sizes"].append({"rows": n, "stages": recorder.stages})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,100k", help="comma-separated row counts, e.g. 1k,100k,1m")
+    parser.add_argument("--repeat", type=int, default=20, help="requests per route")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON from an earlier run")
+    parser.add_argument("--drive-latency", type=float, default=0.05,
+                        help="simulated seconds per fake Drive call")
+    parser.add_argument("--tracemalloc", action="store_true", help="also record per-stage Python peak allocations")
+    args = parser.parse_args(argv)
+
+    # The app logs with print(); keep stdout clean when it carries the JSON
+    with contextlib.redirect_stdout(sys.stderr if args.json == "-" else sys.stdout):
+        results = run_all(args)
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return results
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return results
@@ -0,0 +1,289 @@
+"""Bulk-import historical visits into the store: python bulk_import.py SOURCE... [options]
+
+Use this to rebuild a fresh deploy or a lost disk from dumps instead of
+letting continuous_fetch re-pull (and re-log) the whole history. Sources:
+
+    *.json            a JSON array of raw API visits (UTC timestamps)
+    *.ndjson, *.jsonl one raw API visit per line (UTC); pass --ist for
+                      /download-all?format=ndjson exports, which are IST
+    *.xlsx            a visits workbook (IST), e.g. visitor_data.xlsx
+    DIRECTORY         every daily log below it: YYYY/MM/visitor_DD.xlsx and
+                      the legacy YYYY/MM/DD.xlsx
+
+The import runs in three phases, checkpointed in WORK_DIR/checkpoint.json:
+
+    stage     a process pool parses and normalizes the sources (large NDJSON
+              files in byte-range chunks) and spills each one's rows per day
+              to WORK_DIR/staging as Parquet
+    merge     one pass over the days: a day's staged rows are combined,
+              deduplicated against the store, appended as one segment and
+              merged into that day's Excel log
+    finalize  visitor_data.xlsx is rewritten once and the fetch cursor moves
+              past the newest imported visit, so continuous_fetch carries on
+              from there
+
+Re-running the same command after an interruption continues where it
+stopped, with the task list saved when the import started (the merge adds
+daily logs to the very directories it reads); --restart discards the
+checkpoint. Run it from the app's working
+directory while the app is stopped: it takes the ingest leader lock, so it
+refuses to run beside a multi-worker leader. Files are not uploaded to
+Drive here.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy import lazy_import
+from normalize import VISIT_COLUMNS, normalize_frame
+
+pd = lazy_import("pandas")
+
+
+DAILY_LOG_NAME = re.compile(r"^(visitor_)?\d{2}\.xlsx$")  # visitor_DD.xlsx, legacy DD.xlsx
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+def discover(sources, chunk_bytes):
+    """Expand SOURCE arguments into stage tasks (JSON-able dicts, in a stable order)."""
+    tasks = []
+    for source in sources:
+        if os.path.isdir(source):
+            for path in sorted(glob.glob(os.path.join(source, "**", "*.xlsx"), recursive=True)):
+                if DAILY_LOG_NAME.match(os.path.basename(path)):
+                    tasks.append({"kind": "xlsx", "path": path})
+        elif source.endswith(NDJSON_SUFFIXES):
+            size = os.path.getsize(source)
+            for start in range(0, max(size, 1), chunk_bytes):
+                tasks.append({"kind": "ndjson", "path": source, "start": start, "end": min(start + chunk_bytes, size)})
+        elif source.endswith(".json"):
+            tasks.append({"kind": "json", "path": source})
+        elif source.endswith(".xlsx"):
+            tasks.append({"kind": "xlsx", "path": source})
+        else:
+            raise SystemExit(f"❌ Unsupported source: {source}")
+    for number, task in enumerate(tasks):
+        task["id"] = f"{task['path']}@{task['start']}" if task["kind"] == "ndjson" else task["path"]
+        task["dir"] = f"t{number:05d}"
+    return tasks
+
+
+def iter_ndjson_range(path, start, end):
+    """Records of the lines that start within [start, end) of an NDJSON file."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # the line in progress belongs to the previous chunk
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_source(task, ist):
+    if task["kind"] == "xlsx":
+        return normalize_frame(pd.read_excel(task["path"], dtype=str), utc=False)
+    if task["kind"] == "json":
+        with open(task["path"], "rb") as f:
+            records = json.load(f)
+    else:
+        records = list(iter_ndjson_range(task["path"], task["start"], task["end"]))
+    return normalize_frame(pd.DataFrame.from_records(records, columns=VISIT_COLUMNS), utc=not ist)
+
+
+def stage(task, staging_dir, ist):
+    """Worker: normalize one task and spill its rows per day. Returns {day: rows}."""
+    folder = os.path.join(staging_dir, task["dir"])
+    shutil.rmtree(folder, ignore_errors=True)  # leftovers of an interrupted attempt
+    os.makedirs(folder)
+    df = read_source(task, ist).drop_duplicates(subset=VISIT_COLUMNS)
+    days = {}
+    for day, part in df.groupby(df["timestamp"].str[:10], sort=True):
+        part.to_parquet(os.path.join(folder, f"{day}.parquet"), index=False)
+        days[day] = len(part)
+    return days
+
+
+# -- checkpoint -------------------------------------------------------------------
+
+def fingerprint(tasks):
+    prints = {}
+    for path in sorted({t["path"] for t in tasks}):
+        try:
+            st = os.stat(path)
+            prints[path] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            prints[path] = None
+    return prints
+
+
+def new_checkpoint(tasks, options):
+    return {"options": options, "tasks": tasks, "sources": fingerprint(tasks),
+            "staged": {}, "merged": [], "finalized": False}
+
+
+def load_checkpoint(path, options):
+    """The saved state of the import run with options, or None if it has not started."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("options") != options:
+        raise SystemExit(f"❌ {path} belongs to a different import (sources or options changed); "
+                         "re-run with --restart")
+    if not checkpoint["finalized"]:
+        # Only sources still to be staged must be as they were; staged ones may
+        # since have been rewritten by the merge (daily logs)
+        pending = [t for t in checkpoint["tasks"] if t["id"] not in checkpoint["staged"]]
+        for source, current in fingerprint(pending).items():
+            if checkpoint["sources"].get(source) != current:
+                raise SystemExit(f"❌ {source} changed since the import started; re-run with --restart")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+# -- phases -------------------------------------------------------------------------
+
+def run_stage(tasks, checkpoint, checkpoint_path, staging_dir, workers, ist):
+    pending = [t for t in tasks if t["id"] not in checkpoint["staged"]]
+    if not pending:
+        return
+    print(f"📥 Staging {len(pending)} of {len(tasks)} sources with {workers} workers...")
+    started, rows, failed = time.perf_counter(), 0, 0
+    # spawn: workers must not inherit the parent's threads and locks
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(stage, t, staging_dir, ist): t for t in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            task = futures[future]
+            try:
+                days = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ {task['id']}: {e}")
+                continue
+            checkpoint["staged"][task["id"]] = days
+            save_checkpoint(checkpoint_path, checkpoint)
+            rows += sum(days.values())
+            elapsed = time.perf_counter() - started
+            print(f"   {done}/{len(pending)} staged, {rows:,} rows ({rows / elapsed:,.0f} rows/s)")
+    if failed:
+        raise SystemExit(f"❌ {failed} sources failed; fix them and re-run to continue")
+
+
+def run_merge(app, tasks, checkpoint, checkpoint_path, staging_dir, daily_logs):
+    by_day = {}
+    for task in tasks:
+        for day in checkpoint["staged"].get(task["id"], {}):
+            by_day.setdefault(day, []).append(os.path.join(staging_dir, task["dir"], f"{day}.parquet"))
+    merged = set(checkpoint["merged"])
+    pending = [day for day in sorted(by_day) if day not in merged]
+    if not pending:
+        return
+    print(f"🗂️ Merging {len(pending)} days into the store...")
+    started, added = time.perf_counter(), 0
+    for done, day in enumerate(pending, 1):
+        df = pd.concat([pd.read_parquet(p) for p in by_day[day]], ignore_index=True)
+        df = df.drop_duplicates(subset=VISIT_COLUMNS)
+        # Only rows the store lacks, so a day interrupted after its append is not doubled
+        existing = app.visit_store.read_range(day, day)
+        if not existing.empty:
+            known = pd.MultiIndex.from_frame(existing[VISIT_COLUMNS].astype(str))
+            df = df[~pd.MultiIndex.from_frame(df[VISIT_COLUMNS]).isin(known)]
+        if not df.empty:
+            app.visit_store.append(df)
+            if daily_logs:
+                app.write_daily_logs(df)
+            added += len(df)
+        checkpoint["merged"].append(day)
+        save_checkpoint(checkpoint_path, checkpoint)
+        if done % 10 == 0 or done == len(pending):
+            elapsed = time.perf_counter() - started
+            print(f"   {done}/{len(pending)} days merged, {added:,} new rows ({elapsed:.1f}s)")
+
+
+def run_finalize(app, checkpoint, checkpoint_path):
+    days = sorted(checkpoint["merged"])
+    if days:
+        newest = app.visit_store.read_range(days[-1], days[-1])
+        newest = newest[newest["timestamp"] == newest["timestamp"].max()]
+        cursor = app.load_fetch_cursor()
+        before = cursor["timestamp"]
+        app.advance_cursor(cursor, newest.to_dict(orient="records"))
+        if cursor["timestamp"] != before:
+            app.save_fetch_cursor(cursor)
+            print(f"⏩ Fetch cursor moved to {cursor['timestamp']}")
+        print(f"📊 Writing {app.EXCEL_ALL_FILE}...")
+        app.safe_write_excel(app.visit_store.read_all(), app.EXCEL_ALL_FILE)
+    checkpoint["finalized"] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python bulk_import.py", description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[2:]))
+    parser.add_argument("sources", nargs="+", help="JSON/NDJSON dumps, workbooks or visitor_logs directories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="stage processes")
+    parser.add_argument("--chunk-mb", type=int, default=64, help="NDJSON bytes per stage task")
+    parser.add_argument("--ist", action="store_true", help="JSON/NDJSON timestamps are already IST")
+    parser.add_argument("--work-dir", default=".bulk_import", help="checkpoint and staging directory")
+    parser.add_argument("--skip-daily-logs", action="store_true", help="do not merge into visitor_logs/")
+    parser.add_argument("--restart", action="store_true", help="discard an earlier checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.restart:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+    staging_dir = os.path.join(args.work_dir, "staging")
+    checkpoint_path = os.path.join(args.work_dir, "checkpoint.json")
+    options = {"sources": args.sources, "ist": args.ist, "chunk_mb": args.chunk_mb}
+    checkpoint = load_checkpoint(checkpoint_path, options)
+    if checkpoint is None:
+        tasks = discover(args.sources, args.chunk_mb * 1024 * 1024)
+        if not tasks:
+            raise SystemExit("❌ No importable files found")
+        os.makedirs(staging_dir, exist_ok=True)
+        checkpoint = new_checkpoint(tasks, options)
+        save_checkpoint(checkpoint_path, checkpoint)
+    elif checkpoint["finalized"]:
+        print("✅ Import already completed (use --restart to run it again).")
+        return
+    else:
+        tasks = checkpoint["tasks"]
+        os.makedirs(staging_dir, exist_ok=True)
+        print(f"↩️ Resuming the import in {args.work_dir}")
+
+    import app  # the store backend, log layout and cursor of this working directory
+    from leader import LeaderLock
+
+    lock = LeaderLock(app.LEADER_LOCK_FILE)
+    if not lock.try_acquire():
+        raise SystemExit("❌ Another process holds the ingest lock; stop the app first")
+    try:
+        started = time.perf_counter()
+        run_stage(tasks, checkpoint, checkpoint_path, staging_dir, max(1, args.workers), args.ist)
+        run_merge(app, tasks, checkpoint, checkpoint_path, staging_dir, not args.skip_daily_logs)
+        run_finalize(app, checkpoint, checkpoint_path)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        print(f"✅ Import finished in {time.perf_counter() - started:.1f}s")
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
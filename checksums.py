@@ -0,0 +1,124 @@
+"""Content fingerprints for DataFrames and the files written from them.
+
+* frame_fingerprint hashes a DataFrame's rows before serialization, so an
+  unchanged frame can skip the Excel rewrite entirely. FrameHasher does
+  the same for frames streamed in batches.
+* HashingWriter computes a file's md5 while it is being written.
+* file_checksum streams a file through a reused buffer and remembers the
+  result per (size, mtime), so unchanged files are not read again.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import metrics
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+CHUNK_SIZE = 1024 * 1024
+FRAME_CHUNK_ROWS = 100_000
+
+_buffer_local = threading.local()
+_checksums = {}  # abs path -> (size, mtime_ns, md5)
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def remember_checksum(path, md5):
+    """Record the md5 of a file we just wrote, so file_checksum won't re-read it."""
+    _checksums[os.path.abspath(path)] = (*_stat_key(path), md5)
+
+
+def file_checksum(path):
+    key = os.path.abspath(path)
+    size, mtime_ns = _stat_key(path)
+    cached = _checksums.get(key)
+    if cached and cached[:2] == (size, mtime_ns):
+        return cached[2]
+
+    # One buffer per thread, reused across calls: constant memory for any file size
+    buf = getattr(_buffer_local, "buf", None)
+    if buf is None:
+        buf = _buffer_local.buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    md5 = hashlib.md5()
+    with metrics.timed("checksum", kind="file"), open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            md5.update(view[:n])
+    digest = md5.hexdigest()
+    _checksums[key] = (size, mtime_ns, digest)
+    return digest
+
+
+def frame_fingerprint(df):
+    """Hash of a DataFrame's columns and row values, computed in bounded chunks."""
+    hasher = FrameHasher(df.columns)
+    hasher.update(df)
+    return hasher.hexdigest()
+
+
+class FrameHasher:
+    """frame_fingerprint of frames fed one at a time.
+
+    Rows hash independently, so feeding the batches of a frame gives the
+    same digest as hashing the whole frame at once.
+    """
+
+    def __init__(self, columns):
+        self._columns = list(columns)
+        self._md5 = hashlib.md5()
+        self._md5.update(repr(self._columns).encode())
+
+    def update(self, df):
+        with metrics.timed("checksum", kind="frame"):
+            for start in range(0, len(df), FRAME_CHUNK_ROWS):
+                chunk = df.iloc[start:start + FRAME_CHUNK_ROWS][self._columns]
+                self._md5.update(pd.util.hash_pandas_object(chunk.astype(str), index=False).to_numpy().tobytes())
+
+    def hashed(self, frames):
+        """Pass frames through, hashing each one on the way."""
+        for df in frames:
+            self.update(df)
+            yield df
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+
+class HashingWriter(io.RawIOBase):
+    """Write-through file wrapper that hashes every byte on the way out.
+
+    Reports itself as unseekable so zip writers (openpyxl) stream forward
+    and the digest matches the bytes on disk.
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._md5 = hashlib.md5()
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self._pos
+
+    def write(self, b):
+        self._md5.update(b)
+        self._pos += len(b)
+        return self._fh.write(b)
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
@@ -0,0 +1,204 @@
+"""Memory-compact, immutable containers for the in-process visits and users.
+
+VisitTable stores visits column-wise: email, ip and user_agent are
+dictionary-encoded (each distinct string kept once, rows hold int32
+codes) and timestamps are int64 UTC epochs. A table is never mutated;
+extended() returns a new version. Versions share their append-only
+arrays and string pools, so extending the newest version costs O(new
+rows). Readers holding an older version keep seeing exactly its rows,
+and the writer publishes a new version by swapping one reference.
+
+Users are small, so they are kept as __slots__ records with interned
+strings instead.
+"""
+import calendar
+import sys
+import time
+from array import array
+from collections import Counter
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+IST_OFFSET = 5 * 3600 + 30 * 60  # IST has no DST
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+STRING_COLUMNS = ("email", "ip", "user_agent")
+COLUMNS = ("email", "ip", "timestamp", "user_agent")
+
+
+def ist_to_epoch(ts):
+    """'YYYY-MM-DD HH:MM:SS' in IST -> UTC epoch seconds."""
+    return calendar.timegm(time.strptime(ts, TS_FORMAT)) - IST_OFFSET
+
+
+def epoch_to_ist(epoch):
+    return time.strftime(TS_FORMAT, time.gmtime(epoch + IST_OFFSET))
+
+
+class StringPool:
+    """Append-only dictionary encoding: code <-> distinct string."""
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._codes = {v: i for i, v in enumerate(self.values)}
+
+    def encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def code(self, value):
+        return self._codes.get(value)
+
+
+class VisitTable:
+    __slots__ = ("_pools", "_codes", "_epochs", "_len")
+
+    def __init__(self, pools=None, codes=None, epochs=None, length=0):
+        self._pools = pools or {c: StringPool() for c in STRING_COLUMNS}
+        self._codes = codes or {c: array("i") for c in STRING_COLUMNS}
+        self._epochs = epochs if epochs is not None else array("q")
+        self._len = length
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from a visits DataFrame in vectorized passes."""
+        pools, codes = {}, {}
+        for column in STRING_COLUMNS:
+            col_codes, uniques = pd.factorize(df[column].fillna("").astype(str))
+            pools[column] = StringPool(uniques.tolist())
+            codes[column] = array("i", col_codes.astype(np.int32).tobytes())
+        ts = pd.to_datetime(df["timestamp"], format=TS_FORMAT, errors="coerce")
+        seconds = ts.astype("datetime64[s]").astype("int64").to_numpy() - IST_OFFSET
+        epochs = array("q", np.where(ts.isna().to_numpy(), 0, seconds).astype(np.int64).tobytes())
+        return cls(pools, codes, epochs, len(df))
+
+    @classmethod
+    def from_records(cls, rows):
+        return cls().extended(rows)
+
+    def extended(self, rows):
+        """New version with rows (visit dicts) appended."""
+        table = self
+        if self._len != len(self._epochs) or not isinstance(self._epochs, array):
+            # Not the newest version, or backed by a read-only mapping (see
+            # shared_snapshot.py): branch off with private copies of the arrays
+            table = VisitTable(
+                {c: StringPool(p.values) for c, p in self._pools.items()},
+                {c: _owned("i", self._codes[c][:self._len]) for c in STRING_COLUMNS},
+                _owned("q", self._epochs[:self._len]),
+                self._len,
+            )
+        added = 0
+        for row in rows:
+            for column in STRING_COLUMNS:
+                table._codes[column].append(table._pools[column].encode(str(row.get(column, ""))))
+            table._epochs.append(ist_to_epoch(str(row["timestamp"])))
+            added += 1
+        return VisitTable(table._pools, table._codes, table._epochs, table._len + added)
+
+    def continues(self, other):
+        """True if this is other with zero or more rows appended (shared pools and arrays)."""
+        return self._pools is other._pools and self._len >= other._len
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        pools, codes = self._pools, self._codes
+        return {
+            "email": pools["email"].values[codes["email"][i]],
+            "ip": pools["ip"].values[codes["ip"][i]],
+            "timestamp": epoch_to_ist(self._epochs[i]),
+            "user_agent": pools["user_agent"].values[codes["user_agent"][i]],
+        }
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def epochs(self):
+        return self._epochs[:self._len]
+
+    def codes(self, column):
+        return self._codes[column][:self._len]
+
+    def pool(self, column):
+        return self._pools[column]
+
+    def column(self, column):
+        """Decoded values of one column as a list of strings."""
+        if column == "timestamp":
+            return [epoch_to_ist(e) for e in self.epochs()]
+        values = self._pools[column].values
+        return [values[c] for c in self.codes(column)]
+
+    def to_frame(self):
+        """Decode into a visits DataFrame (vectorized)."""
+        frame = {}
+        for column in COLUMNS:
+            if column == "timestamp":
+                epochs = np.frombuffer(self._epochs, dtype=np.int64)[:self._len] + IST_OFFSET
+                frame[column] = pd.to_datetime(epochs, unit="s").strftime(TS_FORMAT)
+            else:
+                values = np.asarray(self._pools[column].values, dtype=object)
+                frame[column] = values[np.frombuffer(self._codes[column], dtype=np.int32)[:self._len]]
+        return pd.DataFrame(frame, columns=list(COLUMNS))
+
+    def value_counts(self, column):
+        values = self._pools[column].values
+        return {values[c]: n for c, n in Counter(self.codes(column)).items()}
+
+    def sort_keys(self, column):
+        """Per-row ints that sort like the column's values."""
+        if column == "timestamp":
+            return self.epochs()
+        values = self._pools[column].values
+        rank = [0] * len(values)
+        for place, code in enumerate(sorted(range(len(values)), key=values.__getitem__)):
+            rank[code] = place
+        return [rank[c] for c in self.codes(column)]
+
+
+def _owned(typecode, values):
+    """Private, appendable array copy of an array or buffer."""
+    copy = array(typecode)
+    copy.frombytes(memoryview(values).cast("B"))  # frombytes rejects views cast to another format
+    return copy
+
+
+class UserRecord:
+    __slots__ = ("email", "name", "phone", "role", "created_at")
+
+    def __init__(self, email="", name="", phone="", role="", created_at=""):
+        self.email = sys.intern(str(email))
+        self.name = str(name)
+        self.phone = str(phone)
+        self.role = sys.intern(str(role))
+        self.created_at = str(created_at)
+
+    def as_dict(self):
+        return {f: getattr(self, f) for f in self.__slots__}
+
+
+USER_COLUMNS = list(UserRecord.__slots__)  # column order of users.xlsx and the users table
+
+
+def _text(value):
+    return "" if value is None or pd.isna(value) else value
+
+
+def compact_users(users):
+    """Immutable tuple of UserRecord from user dicts (None/NaN become "")."""
+    return tuple(UserRecord(**{f: _text(u.get(f)) for f in UserRecord.__slots__}) for u in users)
@@ -0,0 +1,123 @@
+"""Per-day visitor report: one small workbook per date, built once and cached.
+
+A report holds the day's totals, its hourly rollups, the top emails and
+IPs, and that day's visits only. It is a fixed-size attachment instead of
+the whole history. The .xlsx container is zip-deflated, so the cached
+file is stored compressed.
+
+The cache remembers how many visits each report was built from. A day
+that gains late visits is rebuilt on next use; otherwise the email, the
+/report/<date> download and backfills all reuse the same file.
+"""
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from lazy import lazy_import
+from normalize import VISIT_COLUMNS
+from rollups import ANONYMOUS_EMAILS
+
+openpyxl = lazy_import("openpyxl")
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TOP_N = 20
+
+
+def top_counts(series, exclude=(), n=TOP_N):
+    counts = series[~series.isin(exclude)].value_counts()
+    return list(counts.head(n).items())
+
+
+def write_report(path, day, visits, hourly, totals):
+    """Write the report workbook for day.
+
+    visits is that day's visits DataFrame, hourly the 24 rows from
+    TrafficRollups.hourly(day) and totals its day totals.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+
+    ws = wb.create_sheet(title="Summary")
+    ws.append(["Date", day])
+    ws.append(["Visits", totals["visits"]])
+    ws.append(["Unique emails", totals["unique_emails"]])
+    ws.append(["Unique IPs", totals["unique_ips"]])
+    for device, count in totals["devices"].items():
+        ws.append([f"{device} visits", count])
+    ws.append(["Generated at", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+
+    ws = wb.create_sheet(title="Hourly")
+    devices = list(totals["devices"])
+    ws.append(["Hour", "Visits", "Unique emails", "Unique IPs"] + devices)
+    for row in hourly:
+        ws.append([f"{row['hour']:02d}:00", row["visits"], row["unique_emails"], row["unique_ips"]]
+                  + [row["devices"].get(d, 0) for d in devices])
+
+    ws = wb.create_sheet(title="Top emails")
+    ws.append(["Email", "Visits"])
+    for email, count in top_counts(visits["email"], ANONYMOUS_EMAILS):
+        ws.append([email, int(count)])
+
+    ws = wb.create_sheet(title="Top IPs")
+    ws.append(["IP", "Visits"])
+    for ip, count in top_counts(visits["ip"], ("",)):
+        ws.append([ip, int(count)])
+
+    ws = wb.create_sheet(title="Visits")
+    ws.append(VISIT_COLUMNS)
+    for row in visits.sort_values("timestamp")[VISIT_COLUMNS].itertuples(index=False, name=None):
+        ws.append(row)
+
+    replace_file(path, wb.save)
+
+
+def replace_file(path, write, mode="wb"):
+    """Call write(f) on a fresh temp file beside path, then swap it in.
+
+    The temp name is unique: with several worker processes building the
+    same report, each writes its own file and the last complete one wins.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ReportCache:
+    def __init__(self, folder):
+        self.folder = folder
+        self.index_path = os.path.join(folder, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, day):
+        return os.path.join(self.folder, f"visitor_report_{day}.xlsx")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, day, visits, build):
+        """Path of day's report, calling build(path) only if it is missing or stale.
+
+        visits is the day's current visit count; a report built from another
+        count is stale. Returns (path, built).
+        """
+        path = self.path(day)
+        with self._lock:
+            index = self._load_index()
+            if index.get(day) == visits and os.path.exists(path):
+                return path, False
+            build(path)
+            index[day] = visits
+            # The lock is per process; an entry lost to another worker's write only costs a rebuild
+            replace_file(self.index_path, lambda f: json.dump(index, f, indent=1, sort_keys=True), mode="w")
+            return path, True
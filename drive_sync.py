@@ -0,0 +1,201 @@
+"""Google Drive sync backed by a persisted name -> file metadata index.
+
+The index remembers each file's Drive ID, the md5 both sides agree on and
+Drive's modifiedTime, plus a page token into Drive's changes feed. It
+lives in a JSON file so it survives restarts:
+
+* uploading a file whose content matches the index makes no API call;
+* a known file is updated by ID without a files().list lookup;
+* remote edits are picked up from one changes().list call per sync, and
+  only files whose remote md5 differs are downloaded.
+"""
+import io
+import json
+import os
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+
+import metrics
+from checksums import file_checksum
+
+
+FILE_FIELDS = "id,name,md5Checksum,modifiedTime"
+
+
+class DriveSync:
+    def __init__(self, service, folder_id, index_path, poll_interval=60):
+        self.service = service
+        self.folder_id = folder_id
+        self.index_path = index_path
+        self.poll_interval = poll_interval  # seconds between changes-feed polls
+        self._last_poll = None
+        self._lock = threading.Lock()
+        self._index = {"files": {}, "page_token": None}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+            self._index["files"] = saved.get("files", {})
+            self._index["page_token"] = saved.get("page_token")
+        except Exception as e:
+            print(f"⚠️ Could not read Drive index, rebuilding it: {e}")
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def entry(self, file_name):
+        return self._index["files"].get(file_name)
+
+    def _remember(self, meta, md5=None):
+        self._index["files"][meta["name"]] = {
+            "id": meta["id"],
+            "md5": md5 or meta.get("md5Checksum"),
+            "remote_md5": meta.get("md5Checksum"),
+            "modifiedTime": meta.get("modifiedTime"),
+        }
+
+    def _lookup(self, file_name):
+        # Only used the first time we see a name
+        query = f"'{self.folder_id}' in parents and name='{file_name}' and trashed=false"
+        with metrics.timed("drive_list", call="files"):
+            response = self.service.files().list(q=query, fields=f"files({FILE_FIELDS})").execute()
+        files = response.get('files', [])
+        return files[0] if files else None
+
+    def upload(self, file_path, checksum=None):
+        """Upload file_path unless Drive already has this content. Returns True if uploaded.
+
+        The index lock is not held across network calls, so different files
+        can upload in parallel; callers must not upload the same file twice
+        at once.
+        """
+        file_name = os.path.basename(file_path)
+        current_checksum = checksum or file_checksum(file_path)
+
+        with self._lock:
+            entry = self.entry(file_name)
+            if entry and entry.get("md5") == current_checksum:
+                return False
+            file_id = entry["id"] if entry else None
+
+        with metrics.timed("drive_upload"):
+            meta = self._send(file_path, file_name, file_id)
+        metrics.inc("bytes_total", os.path.getsize(file_path), direction="uploaded")
+
+        with self._lock:
+            self._remember(meta, md5=current_checksum)
+            self._save()
+        return True
+
+    def _send(self, file_path, file_name, file_id):
+        # Update by known ID, else by a name lookup, else create; returns Drive's metadata
+        media = MediaFileUpload(file_path, resumable=True)
+        meta = None
+        if file_id:
+            try:
+                meta = self.service.files().update(
+                    fileId=file_id, media_body=media, fields=FILE_FIELDS
+                ).execute()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                # Deleted on Drive since we indexed it; fall back to a lookup
+
+        if meta is None:
+            existing = self._lookup(file_name)
+            if existing:
+                meta = self.service.files().update(
+                    fileId=existing["id"], media_body=media, fields=FILE_FIELDS
+                ).execute()
+            else:
+                meta = self.service.files().create(
+                    body={'name': file_name, 'parents': [self.folder_id]},
+                    media_body=media,
+                    fields=FILE_FIELDS
+                ).execute()
+        return meta
+
+    def poll_changes(self, force=False):
+        """Fold Drive's changes feed into the index. Returns names whose content changed remotely."""
+        changed = set()
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_poll is not None and now - self._last_poll < self.poll_interval:
+                return changed
+            self._last_poll = now
+
+            token = self._index["page_token"]
+            if token is None:
+                # First run: start the feed here and trust the index as-is
+                start = self.service.changes().getStartPageToken().execute()
+                self._index["page_token"] = start["startPageToken"]
+                self._save()
+                return changed
+
+            by_id = {e["id"]: name for name, e in self._index["files"].items()}
+            while token:
+                with metrics.timed("drive_list", call="changes"):
+                    response = self.service.changes().list(
+                        pageToken=token,
+                        spaces="drive",
+                        fields=f"nextPageToken,newStartPageToken,changes(fileId,removed,file({FILE_FIELDS},trashed))",
+                    ).execute()
+                for change in response.get("changes", []):
+                    name = by_id.get(change.get("fileId"))
+                    if name is None:
+                        continue
+                    meta = change.get("file") or {}
+                    if change.get("removed") or meta.get("trashed"):
+                        self._index["files"].pop(name, None)
+                        continue
+                    entry = self._index["files"][name]
+                    entry["remote_md5"] = meta.get("md5Checksum")
+                    entry["modifiedTime"] = meta.get("modifiedTime")
+                    if entry["remote_md5"] != entry["md5"]:
+                        changed.add(name)
+                token = response.get("nextPageToken")
+                if response.get("newStartPageToken"):
+                    self._index["page_token"] = response["newStartPageToken"]
+            self._save()
+        return changed
+
+    def download_if_changed(self, file_name, local_path=None):
+        """Download file_name when the local copy is missing or Drive's content differs."""
+        local_path = local_path or file_name
+        self.poll_changes()
+
+        with self._lock:
+            entry = self.entry(file_name)
+            if entry is None:
+                meta = self._lookup(file_name)
+                if meta is None:
+                    return False
+                self._remember(meta, md5=file_checksum(local_path) if os.path.exists(local_path) else None)
+                entry = self.entry(file_name)
+            if os.path.exists(local_path) and entry.get("md5") == entry.get("remote_md5"):
+                return False
+
+            # Download next to the target and swap in, so readers never see a partial file
+            tmp_path = local_path + ".download"
+            request = self.service.files().get_media(fileId=entry["id"])
+            with metrics.timed("drive_download"), io.FileIO(tmp_path, 'wb') as fh:
+                downloader = MediaIoBaseDownload(fh, request)
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+            os.replace(tmp_path, local_path)
+            metrics.inc("bytes_total", os.path.getsize(local_path), direction="downloaded")
+
+            entry["md5"] = file_checksum(local_path)
+            self._save()
+            return True
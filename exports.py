@@ -0,0 +1,52 @@
+"""Exports built straight from stored partitions.
+
+Rows are written frame by frame (bounded row batches from the store), so
+an export never needs the whole history in one DataFrame or any per-day
+workbook. Text formats can be gzip-compressed on the fly.
+"""
+import csv
+import io
+import zlib
+
+from lazy import lazy_import
+
+openpyxl = lazy_import("openpyxl")
+
+
+def iter_csv(frames, columns):
+    """Yield CSV text: a header, then each frame's rows as they are read."""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(columns)
+    yield buf.getvalue()
+    for df in frames:
+        if not df.empty:
+            yield df.to_csv(index=False, header=False, columns=columns, lineterminator="\n")
+
+
+def iter_ndjson(frames, columns):
+    """Yield newline-delimited JSON, one object per row."""
+    for df in frames:
+        if not df.empty:
+            text = df[columns].to_json(orient="records", lines=True, force_ascii=False)
+            yield text if text.endswith("\n") else text + "\n"
+
+
+def iter_gzip(chunks, level=6):
+    """gzip-compress a stream of str/bytes chunks as they go by."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_xlsx(frames, columns, fileobj, sheet_title="Visitors"):
+    """Write frames to fileobj as one sheet using openpyxl's write-only mode."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title)
+    ws.append(columns)
+    for df in frames:
+        for row in df[columns].itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(fileobj)
@@ -0,0 +1,68 @@
+"""Shared HTTP session for the visits/users API.
+
+One pooled keep-alive session with gzip, timeouts and retries on
+transient gateway errors. Responses' ETag/Last-Modified validators are
+remembered per URL once the caller has processed the body, and sent back
+as If-None-Match/If-Modified-Since so unchanged endpoints answer 304.
+"""
+import threading
+
+from lazy import lazy_import
+
+requests = lazy_import("requests")
+urllib3_retry = lazy_import("urllib3.util.retry")
+
+
+DEFAULT_TIMEOUT = (5, 30)  # connect, read (seconds)
+
+
+class ConditionalClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_size=4, retries=2):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self._session = None  # built on first request, so importing the app skips requests
+        self._validators = {}  # final URL -> request headers to revalidate with
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=urllib3_retry.Retry(total=self.retries, backoff_factor=0.5,
+                                                    status_forcelist=(502, 503, 504), allowed_methods={"GET"}),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+                self._session = session
+            return self._session
+
+    def get(self, url, params=None, stream=False):
+        """GET url; returns None when the server says nothing changed (304)."""
+        prepared = requests.Request("GET", url, params=params).prepare()
+        with self._lock:
+            headers = dict(self._validators.get(prepared.url, {}))
+        response = self.session.get(prepared.url, headers=headers, timeout=self.timeout, stream=stream)
+        if response.status_code == 304:
+            response.close()
+            return None
+        response.raise_for_status()
+        return response
+
+    def mark_processed(self, response):
+        """Remember response's validators; call only after its body was handled."""
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        with self._lock:
+            if validators:
+                self._validators[response.request.url] = validators
+            else:
+                self._validators.pop(response.request.url, None)
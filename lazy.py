@@ -0,0 +1,34 @@
+"""Deferred imports for heavy dependencies.
+
+    pd = lazy_import("pandas")
+
+binds a stand-in that imports pandas on first attribute access and then
+behaves like the module itself, so importing the app stays cheap and
+code paths that never touch pandas never pay for it.
+"""
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def _load(self):
+        module = importlib.import_module(self._name)
+        # Copy the module's namespace in, so later lookups skip __getattr__
+        self.__dict__.update(module.__dict__)
+        self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        # Only reached for names not copied in yet (first use, or lazily added submodules)
+        module = self.__dict__.get("_module") or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if "_module" in self.__dict__ else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
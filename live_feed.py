@@ -0,0 +1,77 @@
+"""In-process pub/sub behind the /stream Server-Sent Events endpoint.
+
+The ingest tick publishes each batch once; the message is formatted as an
+SSE frame once and appended to every subscriber's buffer. Subscribers are
+woken through a callback, so the publishing thread can wake coroutines on
+an event loop (asgi.py) without blocking on them.
+
+Buffers are bounded: a client that falls more than buffer_size messages
+behind has its backlog dropped and gets a single "reload" event instead,
+so one stalled browser cannot grow the server's memory.
+"""
+import json
+import threading
+from collections import deque
+
+
+RETRY_MS = 5000
+KEEPALIVE = ": keepalive\n\n"
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+RELOAD = format_event("reload", {})
+
+
+class Subscription:
+    __slots__ = ("buffer", "overflowed", "notify")
+
+    def __init__(self, notify):
+        self.buffer = deque()
+        self.overflowed = False
+        self.notify = notify
+
+    def drain(self):
+        """Pending SSE frames as one string ('' if none)."""
+        if self.overflowed:
+            self.overflowed = False
+            self.buffer.clear()
+            return RELOAD
+        frames = []
+        while self.buffer:
+            frames.append(self.buffer.popleft())
+        return "".join(frames)
+
+
+class Broker:
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, notify):
+        """Register a client; notify() is called (from the publishing thread) on new messages."""
+        subscription = Subscription(notify)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        frame = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if len(subscription.buffer) >= self.buffer_size:
+                subscription.overflowed = True
+            else:
+                subscription.buffer.append(frame)
+            subscription.notify()
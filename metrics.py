@@ -0,0 +1,134 @@
+"""In-process metrics, exposed in the Prometheus text format.
+
+    with metrics.timed("excel_write"):
+        ...
+    metrics.inc("rows_ingested_total", len(rows))
+
+Stage timings all go to one histogram, visitors_stage_seconds{stage=...},
+so a tick can be broken down by stage. Counters take free-form labels,
+and gauges are callbacks read at scrape time. Updates take one lock
+each, which is cheap next to the work they measure.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+PREFIX = "visitors_"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "stage_seconds": "Time spent per pipeline stage",
+    "request_seconds": "Flask request latency by endpoint",
+    "requests_total": "Flask requests by endpoint and status",
+    "ticks_total": "Scheduler ingest ticks by result",
+    "rows_ingested_total": "Visits persisted by the ingest pipeline",
+    "user_changes_total": "User records added, changed or removed by the ingest pipeline",
+    "uploads_total": "Drive uploads by result",
+    "bytes_total": "Bytes moved, by direction",
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+_gauges = {}      # name -> (callback, help)
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        buckets = _histograms.get(key)
+        if buckets is None:
+            buckets = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[len(BUCKETS)] += 1
+        buckets[-1] += seconds
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Record the block's wall time under visitors_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+
+def gauge(name, callback, help=""):
+    """Register a gauge whose value is callback() at scrape time."""
+    with _lock:
+        _gauges[name] = (callback, help)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(buckets)) for key, buckets in _histograms.items())
+        gauges = sorted(_gauges.items())
+
+    lines = []
+    described = set()
+
+    def describe(name, kind, help_text):
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for (name, labels), value in counters:
+        describe(name, "counter", HELP.get(name, name))
+        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), buckets in histograms:
+        describe(name, "histogram", HELP.get(name, name))
+        cumulative = 0
+        for bound, count in zip(BUCKETS, buckets):
+            cumulative += count
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+        cumulative += buckets[len(BUCKETS)]
+        lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {buckets[-1]:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {cumulative}")
+
+    for name, (callback, help_text) in gauges:
+        try:
+            value = callback()
+        except Exception:
+            continue  # a broken gauge must not break the scrape
+        describe(name, "gauge", help_text or name)
+        lines.append(f"{PREFIX}{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
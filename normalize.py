@@ -0,0 +1,34 @@
+"""Visit normalization shared by the fetch job and bulk_import.py.
+
+Kept free of app imports so bulk-import worker processes stay light.
+"""
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+VISIT_COLUMNS = ["email", "ip", "timestamp", "user_agent"]
+
+
+def normalize_frame(df, utc=True):
+    """Clean a visits DataFrame: blanks filled, timestamps as IST 'YYYY-MM-DD HH:MM:SS'.
+
+    utc=True for raw API visits (UTC timestamps); utc=False for our own
+    exports and Excel logs, which are already in IST. Rows whose timestamp
+    does not parse are dropped.
+    """
+    df = df.reindex(columns=VISIT_COLUMNS)
+    df["email"] = df["email"].fillna("Guest").astype(str)
+    df["ip"] = df["ip"].fillna("").astype(str)
+    df["user_agent"] = df["user_agent"].fillna("").astype(str)
+
+    # ISO ("...T...Z"/offset) and plain "YYYY-MM-DD HH:MM:SS" both parse
+    ts = pd.to_datetime(df["timestamp"], utc=utc, format="ISO8601", errors="coerce")
+    if ts.isna().any():
+        print(f"⚠️ Error parsing timestamp: {int(ts.isna().sum())} rows skipped")
+        df, ts = df[ts.notna()], ts[ts.notna()]
+    if utc:
+        ts = ts.dt.tz_convert("Asia/Kolkata").dt.tz_localize(None)
+    # Not astype(str): pandas drops the time when every row of a batch is at midnight
+    df["timestamp"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df
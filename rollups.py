@@ -0,0 +1,107 @@
+"""Daily and hourly traffic rollups, maintained as visits are ingested.
+
+Each (date, hour) bucket keeps its visit count, the distinct emails and
+IPs seen, and the device mix; each date keeps the same at day level. A
+query over a date range walks one bucket per day, so its cost tracks the
+number of days, not visits. Distinct counts are exact ("Guest" and empty
+emails are not counted as visitors).
+"""
+import threading
+
+import ua_classifier
+
+
+ANONYMOUS_EMAILS = ("", "Guest")  # not counted as visitors, here or in the daily report
+
+
+class _Bucket:
+    __slots__ = ("visits", "emails", "ips", "devices")
+
+    def __init__(self):
+        self.visits = 0
+        self.emails = set()
+        self.ips = set()
+        self.devices = dict.fromkeys(ua_classifier.DEVICES, 0)
+
+    def add(self, visits, emails, ips, devices):
+        self.visits += visits
+        self.emails.update(e for e in emails if e not in ANONYMOUS_EMAILS)
+        self.ips.update(i for i in ips if i)
+        for device, n in devices.items():
+            self.devices[device] = self.devices.get(device, 0) + n
+
+    def as_dict(self):
+        return {
+            "visits": self.visits,
+            "unique_emails": len(self.emails),
+            "unique_ips": len(self.ips),
+            "devices": dict(self.devices),
+        }
+
+
+class TrafficRollups:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._days = {}   # "YYYY-MM-DD" -> _Bucket
+        self._hours = {}  # ("YYYY-MM-DD", hour) -> _Bucket
+
+    def _bucket(self, table, key):
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = _Bucket()
+        return bucket
+
+    def add(self, visits):
+        """Fold a batch of visit dicts (IST 'YYYY-MM-DD HH:MM:SS' timestamps) in."""
+        with self._lock:
+            for visit in visits:
+                ts = str(visit.get("timestamp", ""))
+                if len(ts) < 13:
+                    continue
+                day, hour = ts[:10], int(ts[11:13])
+                email, ip = [str(visit.get("email", ""))], [str(visit.get("ip", ""))]
+                device = {ua_classifier.classify(visit.get("user_agent", "")).device: 1}
+                self._bucket(self._days, day).add(1, email, ip, device)
+                self._bucket(self._hours, (day, hour)).add(1, email, ip, device)
+
+    def add_frame(self, df):
+        """Bulk version of add for a visits DataFrame, grouped per hour in one pass."""
+        if df.empty:
+            return
+        df = df.assign(
+            day=df["timestamp"].str[:10],
+            hour=df["timestamp"].str[11:13].astype(int),
+            device=ua_classifier.classify_series(df["user_agent"])["device"].to_numpy(),
+        )
+        with self._lock:
+            for (day, hour), group in df.groupby(["day", "hour"], sort=False):
+                devices = group["device"].value_counts().to_dict()
+                emails, ips = group["email"].unique(), group["ip"].unique()
+                self._bucket(self._days, day).add(len(group), emails, ips, devices)
+                self._bucket(self._hours, (day, hour)).add(len(group), emails, ips, devices)
+
+    def days(self):
+        with self._lock:
+            return sorted(self._days)
+
+    def daily(self, date_from=None, date_to=None):
+        """Per-day rows plus range totals for date_from..date_to (inclusive)."""
+        with self._lock:
+            days = sorted(
+                d for d in self._days
+                if (not date_from or d >= date_from) and (not date_to or d <= date_to)
+            )
+            rows = [dict(date=d, **self._days[d].as_dict()) for d in days]
+            totals = _Bucket()
+            for d in days:
+                bucket = self._days[d]
+                totals.add(bucket.visits, bucket.emails, bucket.ips, bucket.devices)
+        return {"days": rows, "totals": totals.as_dict()}
+
+    def hourly(self, day):
+        """24 rows for one day; hours without visits are zero."""
+        with self._lock:
+            return [
+                dict(hour=h, **(self._hours[(day, h)].as_dict() if (day, h) in self._hours else _Bucket().as_dict()))
+                for h in range(24)
+            ]
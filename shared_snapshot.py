@@ -0,0 +1,119 @@
+"""Dashboard snapshot shared between worker processes through one mapped file.
+
+In multi-worker mode the leader (see leader.py) writes each new snapshot
+here and the other workers map it read-only. A follower's VisitTable
+indexes straight into the mapping, so the per-row data lives once in the
+page cache however many workers there are; only the string pools, users
+and aggregates are decoded per worker.
+
+File layout:
+    8 bytes   header length H (little-endian uint64)
+    H bytes   JSON header: generation, rows, pools, users, agent_counts
+              and the byte offset of each array below
+    ...       int64 epochs, then int32 codes per string column (native order)
+
+Each version is written to a temp file and swapped in with os.replace, so
+readers always map a complete file. Mappings of the previous version stay
+valid until they are dropped.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from compact import STRING_COLUMNS, StringPool, VisitTable, compact_users
+
+
+HEADER_SIZE = struct.Struct("<Q")
+
+
+class SharedSnapshot:
+    __slots__ = ("visits", "users", "agent_counts", "generation", "appended_from")
+
+    def __init__(self, visits, users, agent_counts, generation, appended_from):
+        self.visits = visits
+        self.users = users
+        self.agent_counts = agent_counts
+        self.generation = generation
+        # Row count of the previously loaded version if this one only appends to it, else None
+        self.appended_from = appended_from
+
+
+class SnapshotFile:
+    def __init__(self, path):
+        self.path = path
+        self._written = None    # VisitTable last exported by this process
+        self._generation = None
+        self._seen = None       # (inode, mtime, size) of the version last loaded
+        self._loaded = None     # (generation, rows) of the version last loaded
+
+    # -- leader -----------------------------------------------------------------
+
+    def write(self, visits, users, agent_counts):
+        """Export a snapshot. Readers can tell a pure append from a rebuild by its generation."""
+        if self._written is None or not visits.continues(self._written):
+            self._generation = time.time_ns()  # unique across leader restarts too
+
+        rows = len(visits)
+        arrays = [("timestamp", visits.epochs())] + [(c, visits.codes(c)) for c in STRING_COLUMNS]
+        header = {
+            "generation": self._generation,
+            "rows": rows,
+            "pools": {c: visits.pool(c).values for c in STRING_COLUMNS},
+            "users": [u.as_dict() for u in users],
+            "agent_counts": agent_counts,
+            "offsets": {},
+        }
+        # Offsets depend on the header's own length: size it with placeholders, then pad to 8 bytes
+        for column, _ in arrays:
+            header["offsets"][column] = 0
+        blob = json.dumps(header).encode("utf-8")
+        start = -(-(HEADER_SIZE.size + len(blob) + 64) // 8) * 8
+        offset = start
+        for column, values in arrays:
+            header["offsets"][column] = offset
+            offset += values.itemsize * rows
+        blob = json.dumps(header).encode("utf-8").ljust(start - HEADER_SIZE.size)
+
+        folder = os.path.dirname(self.path) or "."
+        with tempfile.NamedTemporaryFile(delete=False, dir=folder, suffix=".tmp") as tmp:
+            tmp.write(HEADER_SIZE.pack(len(blob)))
+            tmp.write(blob)
+            for _, values in arrays:
+                tmp.write(values)
+        os.replace(tmp.name, self.path)
+        self._written = visits
+
+    # -- followers --------------------------------------------------------------
+
+    def read_if_changed(self):
+        """Map the current version if it is newer than the last one read; else None."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            st = os.fstat(f.fileno())
+            seen = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if seen == self._seen:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (size,) = HEADER_SIZE.unpack_from(mapped, 0)
+        header = json.loads(mapped[HEADER_SIZE.size:HEADER_SIZE.size + size])
+        rows, offsets = header["rows"], header["offsets"]
+        view = memoryview(mapped)
+        epochs = view[offsets["timestamp"]:offsets["timestamp"] + 8 * rows].cast("q")
+        codes = {c: view[offsets[c]:offsets[c] + 4 * rows].cast("i") for c in STRING_COLUMNS}
+        pools = {c: StringPool(header["pools"][c]) for c in STRING_COLUMNS}
+        visits = VisitTable(pools, codes, epochs, rows)
+
+        generation = header["generation"]
+        appended_from = None
+        if self._loaded and self._loaded[0] == generation and rows >= self._loaded[1]:
+            appended_from = self._loaded[1]
+        self._seen, self._loaded = seen, (generation, rows)
+        return SharedSnapshot(visits, compact_users(header["users"]), header["agent_counts"],
+                              generation, appended_from)
@@ -0,0 +1,185 @@
+"""Embedded SQLite backend for visits and users (opt-in, STORAGE_BACKEND=sqlite).
+
+Implements the same interface as VisitStore, so the app can use either.
+The database runs in WAL mode: one writer (the ingest tick) and any
+number of request threads read concurrently without blocking each other.
+
+* visits: UNIQUE(timestamp, email, ip, user_agent) is the dedup key, so
+  ingest is a single INSERT OR IGNORE batch. Its leading timestamp column
+  doubles as the timestamp index for date-range reads. email and ip have
+  their own indexes.
+* users: keyed by email; each tick upserts and deletes only the changed rows.
+
+Each thread uses its own connection. Excel files are exports built from
+here; the database is the source of truth.
+"""
+import os
+import sqlite3
+import threading
+
+from compact import USER_COLUMNS
+from lazy import lazy_import
+from normalize import VISIT_COLUMNS
+
+pd = lazy_import("pandas")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    email      TEXT NOT NULL,
+    ip         TEXT NOT NULL,
+    timestamp  TEXT NOT NULL,  -- IST 'YYYY-MM-DD HH:MM:SS'
+    user_agent TEXT NOT NULL,
+    UNIQUE (timestamp, email, ip, user_agent)
+);
+CREATE INDEX IF NOT EXISTS visits_email ON visits (email);
+CREATE INDEX IF NOT EXISTS visits_ip ON visits (ip);
+
+CREATE TABLE IF NOT EXISTS users (
+    email      TEXT PRIMARY KEY,
+    name       TEXT NOT NULL DEFAULT '',
+    phone      TEXT NOT NULL DEFAULT '',
+    role       TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT ''
+);
+"""
+
+UPSERT_USER = """
+INSERT INTO users (email, name, phone, role, created_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (email) DO UPDATE SET
+    name = excluded.name, phone = excluded.phone, role = excluded.role, created_at = excluded.created_at
+WHERE (users.name, users.phone, users.role, users.created_at)
+   IS NOT (excluded.name, excluded.phone, excluded.role, excluded.created_at)
+"""
+
+
+def _day_bounds(start, end):
+    """WHERE clause + params for start <= day <= end on the indexed timestamp column."""
+    clauses, params = [], []
+    if start:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("timestamp < ?")
+        params.append(end + "~")  # '~' sorts after any time of day
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SqliteStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        self.refresh()
+
+    def refresh(self):
+        """Reload the distinct days; append() keeps them current for this process's own writes."""
+        rows = self._conn().execute("SELECT DISTINCT substr(timestamp, 1, 10) FROM visits")
+        self._days = {row[0] for row in rows}
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- visits (VisitStore interface) ----------------------------------------
+
+    def days(self, start=None, end=None):
+        return sorted(
+            d for d in self._days
+            if (start is None or d >= start) and (end is None or d <= end)
+        )
+
+    def is_empty(self):
+        return not self._days
+
+    def append(self, rows):
+        """Insert rows, ignoring ones already stored. Returns the days touched."""
+        df = pd.DataFrame(rows, columns=VISIT_COLUMNS)
+        if df.empty:
+            return []
+        df = df.fillna("").astype(str)
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO visits (email, ip, timestamp, user_agent) VALUES (?, ?, ?, ?)",
+                df[VISIT_COLUMNS].itertuples(index=False, name=None),
+            )
+        touched = sorted(set(df["timestamp"].str[:10]))
+        self._days = self._days | set(touched)  # swapped, never mutated: readers may be iterating
+        return touched
+
+    def _query(self, start=None, end=None):
+        where, params = _day_bounds(start, end)
+        return f"SELECT email, ip, timestamp, user_agent FROM visits{where} ORDER BY timestamp", params
+
+    def read_range(self, start=None, end=None):
+        sql, params = self._query(start, end)
+        rows = self._conn().execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=VISIT_COLUMNS)
+
+    def read_all(self):
+        return self.read_range()
+
+    def read_day(self, day):
+        return self.read_range(day, day)
+
+    def iter_days(self, start=None, end=None):
+        for day in self.days(start, end):
+            yield self.read_day(day)
+
+    def iter_batches(self, start=None, end=None, batch_rows=50_000):
+        """Yield DataFrames of at most batch_rows visits, oldest first, from one indexed scan."""
+        sql, params = self._query(start, end)
+        cursor = self._conn().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    return
+                yield pd.DataFrame(rows, columns=VISIT_COLUMNS)
+        finally:
+            cursor.close()
+
+    def compact(self, day=None):
+        """Nightly maintenance: fold the WAL back into the database and refresh planner stats."""
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("PRAGMA optimize")
+
+    # -- users ------------------------------------------------------------------
+
+    def upsert_users(self, users):
+        """Insert new users and update changed ones, keyed by email. Returns rows changed."""
+        df = pd.DataFrame(users, columns=USER_COLUMNS).fillna("").astype(str)
+        df = df[df["email"] != ""].drop_duplicates(subset="email", keep="last")
+        if df.empty:
+            return 0
+        conn = self._conn()
+        with self._write_lock, conn:
+            before = conn.total_changes
+            conn.executemany(UPSERT_USER, df[USER_COLUMNS].itertuples(index=False, name=None))
+            return conn.total_changes - before
+
+    def delete_users(self, emails):
+        """Delete users by email. Returns rows deleted."""
+        if not emails:
+            return 0
+        conn = self._conn()
+        with self._write_lock, conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM users WHERE email = ?", ((e,) for e in emails))
+            return conn.total_changes - before
+
+    def read_users(self):
+        rows = self._conn().execute(f"SELECT {', '.join(USER_COLUMNS)} FROM users ORDER BY rowid").fetchall()
+        return pd.DataFrame(rows, columns=USER_COLUMNS)
@@ -0,0 +1,7 @@
+"""Offline stand-ins shared by tests/ and benchmarks/.
+
+    synthetic   visit generators
+    stub_api    local HTTP server for the admin visits/users API
+    fake_drive  in-memory Drive v3 service
+    app_state   reset_app(), pointing the app module at a fresh working directory
+"""
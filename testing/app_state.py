@@ -0,0 +1,26 @@
+"""Reset the app module's global state, for tests and benchmarks."""
+import os
+
+
+def reset_app(app, workdir, drive_latency=0.0):
+    """Point every piece of app state at a fresh working directory."""
+    from compact import VisitTable
+    from drive_sync import DriveSync
+    from http_client import ConditionalClient
+    from testing.fake_drive import FakeDriveService
+    from visit_store import VisitStore
+
+    os.chdir(workdir)
+    os.makedirs(app.DATA_FOLDER, exist_ok=True)
+    app.visit_store = VisitStore(app.VISIT_STORE_DIR)
+    app.fetched_data = VisitTable()
+    app.fetched_users = ()
+    app.user_hashes = {}
+    app.dashboard_snapshot = None
+    app.traffic_rollups = None
+    app.excel_fingerprints = None
+    app.http_client = ConditionalClient()
+    drive = FakeDriveService(latency=drive_latency)
+    app.drive_sync = DriveSync(drive, app.FOLDER_ID, app.DRIVE_INDEX_FILE)
+    app.drive_ready = True
+    return drive
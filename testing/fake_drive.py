@@ -0,0 +1,148 @@
+"""In-memory stand-in for the Drive v3 service, for offline runs.
+
+Covers the calls drive_sync makes: files().list/create/update/get_media
+and changes().getStartPageToken/list. Every API call is counted in
+`calls` so callers can check how many requests a sync made.
+
+    from testing.fake_drive import FakeDriveService
+    sync = DriveSync(FakeDriveService(), "folder", "drive_index.json")
+"""
+import hashlib
+import itertools
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+from googleapiclient.errors import HttpError
+
+
+class _Response(dict):
+    def __init__(self, status, **headers):
+        super().__init__(headers)
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+
+
+class _Call:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self, num_retries=0):
+        return self._fn()
+
+
+class _MediaRequest:
+    """Enough of HttpRequest for MediaIoBaseDownload to page through content."""
+
+    def __init__(self, content):
+        self.uri = "fake://media"
+        self.headers = {}
+        self.http = self
+        self._content = content
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        start, end = map(int, headers["range"].split("=")[1].split("-"))
+        total = len(self._content)
+        chunk = self._content[start:end + 1]
+        return _Response(206, **{"content-range": f"bytes {start}-{start + len(chunk) - 1}/{total}"}), chunk
+
+
+class FakeDriveService:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.files_by_id = {}
+        self.changes_log = []  # list of file ids, position = change number
+        self._ids = itertools.count(1)
+
+    # -- helpers used by tests and benchmarks to simulate edits made elsewhere --------
+
+    def put(self, name, content, parents=("folder",)):
+        file_id = f"file{next(self._ids)}"
+        self.files_by_id[file_id] = {"id": file_id, "name": name, "parents": list(parents)}
+        self._set_content(file_id, content)
+        return file_id
+
+    def edit(self, file_id, content):
+        self._set_content(file_id, content)
+
+    def _set_content(self, file_id, content):
+        meta = self.files_by_id[file_id]
+        meta["content"] = content
+        meta["md5Checksum"] = hashlib.md5(content).hexdigest()
+        meta["modifiedTime"] = datetime.now(timezone.utc).isoformat()
+        self.changes_log.append(file_id)
+
+    def _public(self, meta):
+        return {k: v for k, v in meta.items() if k not in ("content", "parents")}
+
+    def _call(self, name, fn):
+        self.calls[name] += 1
+        if self.latency:
+            import time
+            time.sleep(self.latency)
+        return _Call(fn)
+
+    # -- service surface ------------------------------------------------------
+
+    def files(self):
+        return _FilesResource(self)
+
+    def changes(self):
+        return _ChangesResource(self)
+
+
+class _FilesResource:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q="", fields=None, **kwargs):
+        name = re.search(r"name='([^']*)'", q)
+        parent = re.search(r"'([^']*)' in parents", q)
+
+        def run():
+            found = [
+                self.drive._public(m) for m in self.drive.files_by_id.values()
+                if (not name or m["name"] == name.group(1))
+                and (not parent or parent.group(1) in m["parents"])
+            ]
+            return {"files": found}
+        return self.drive._call("files.list", run)
+
+    def create(self, body, media_body, fields=None):
+        def run():
+            file_id = self.drive.put(body["name"], media_body.getbytes(0, media_body.size()),
+                                     parents=body.get("parents", ()))
+            return self.drive._public(self.drive.files_by_id[file_id])
+        return self.drive._call("files.create", run)
+
+    def update(self, fileId, media_body, fields=None):
+        def run():
+            if fileId not in self.drive.files_by_id:
+                raise HttpError(_Response(404), b"File not found")
+            self.drive.edit(fileId, media_body.getbytes(0, media_body.size()))
+            return self.drive._public(self.drive.files_by_id[fileId])
+        return self.drive._call("files.update", run)
+
+    def get_media(self, fileId):
+        self.drive.calls["files.get_media"] += 1
+        return _MediaRequest(self.drive.files_by_id[fileId]["content"])
+
+
+class _ChangesResource:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self):
+        return self.drive._call("changes.getStartPageToken",
+                                lambda: {"startPageToken": str(len(self.drive.changes_log))})
+
+    def list(self, pageToken, fields=None, **kwargs):
+        def run():
+            start = int(pageToken)
+            changes = [
+                {"fileId": fid, "removed": False, "file": self.drive._public(self.drive.files_by_id[fid])}
+                for fid in self.drive.changes_log[start:]
+            ]
+            return {"changes": changes, "newStartPageToken": str(len(self.drive.changes_log))}
+        return self.drive._call("changes.list", run)
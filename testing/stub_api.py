@@ -0,0 +1,94 @@
+"""Local stand-in for the heritage-flask-app admin API.
+
+Serves /admin/visits and /admin/users from in-memory lists with ETag and
+Last-Modified validators (answering 304 when they match), gzip when the
+client accepts it, and the `since` filter on visits.
+
+    stub = StubAPI(visits, users).start()
+    app.DATA_URL = stub.url("/admin/visits")
+    ...
+    stub.stop()
+"""
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubAPI:
+    def __init__(self, visits=(), users=(), host="127.0.0.1", port=0):
+        self.visits = list(visits)
+        self.users = list(users)
+        self.requests = []  # (path, status) for each request served
+        self._modified = format_datetime(datetime.now(timezone.utc), usegmt=True)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def url(self, path):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_visits(self, visits):
+        self.visits.extend(visits)
+        self._modified = format_datetime(datetime.now(timezone.utc), usegmt=True)
+
+    def _body(self, path, query):
+        if path == "/admin/visits":
+            rows = self.visits
+            since = query.get("since", [""])[0]
+            if since:
+                since = since.replace("+00:00", "").replace("Z", "")
+                rows = [v for v in rows if v["timestamp"].replace("Z", "").replace(" ", "T") >= since]
+            return rows
+        if path == "/admin/users":
+            return self.users
+        return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                rows = stub._body(parsed.path, parse_qs(parsed.query))
+                if rows is None:
+                    return self._send(404, b"not found")
+                body = json.dumps(rows).encode()
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, b"", etag=etag, path=parsed.path)
+                headers = {"Content-Type": "application/json", "ETag": etag, "Last-Modified": stub._modified}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, path=parsed.path, **headers)
+
+            def _send(self, status, body, path=None, **headers):
+                stub.requests.append((path or self.path, status))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name.replace("etag", "ETag"), value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,41 @@
+"""Synthetic visit generators shared by the tests and benchmarks."""
+import random
+from datetime import datetime, timedelta
+
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Go-http-client/1.1",
+    "python-requests/2.32.3",
+]
+
+
+def make_visits(n, days=1, start="2025-07-01", seed=0):
+    """n normalized visits (IST 'YYYY-MM-DD HH:MM:SS') spread over `days` days."""
+    rng = random.Random(seed)
+    base = datetime.strptime(start, "%Y-%m-%d")
+    span = days * 86400
+    emails = ["Guest"] * 8 + [f"user{i}@example.com" for i in range(max(1, n // 50))]
+    rows = []
+    for i in range(n):
+        ts = base + timedelta(seconds=(i * span) // max(n, 1))
+        rows.append({
+            "email": rng.choice(emails),
+            "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+            "user_agent": rng.choice(USER_AGENTS),
+        })
+    return rows
+
+
+def make_raw_visits(n, days=1, start="2025-07-01", seed=0):
+    """n visits as the /admin/visits API returns them (UTC, ISO or plain format)."""
+    rows = make_visits(n, days=days, start=start, seed=seed)
+    for i, row in enumerate(rows):
+        ts = row["timestamp"]
+        row["timestamp"] = ts.replace(" ", "T") + "Z" if i % 4 else ts
+    return rows
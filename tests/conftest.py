@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules and the shared fakes (testing/) live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AUTOSTART_JOBS", "0")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app module, with its working directory and state reset to an empty tmp_path."""
+    import app as flask_app
+    from testing.app_state import reset_app
+
+    monkeypatch.chdir(tmp_path)  # restored afterwards; reset_app changes into it
+    reset_app(flask_app, str(tmp_path))
+    return flask_app
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from testing.synthetic import make_visits
+from visit_store import VisitStore
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs bulk_import.py, dying like a killed process right after the merge
+# appended (and logged) a day but before that day reached the checkpoint
+KILLED_RUN = """
+import os, sys
+sys.path.insert(0, {repo!r})
+import bulk_import
+save = bulk_import.save_checkpoint
+def save_checkpoint(path, checkpoint):
+    if len(checkpoint["merged"]) == {kill_at}:
+        os._exit(9)
+    save(path, checkpoint)
+bulk_import.save_checkpoint = save_checkpoint
+bulk_import.main(sys.argv[1:])
+"""
+
+
+def run_import(workdir, *args, kill_at=None):
+    if kill_at is None:
+        command = [sys.executable, os.path.join(REPO, "bulk_import.py")]
+    else:
+        command = [sys.executable, "-c", KILLED_RUN.format(repo=REPO, kill_at=kill_at)]
+    env = dict(os.environ, AUTOSTART_JOBS="0")
+    return subprocess.run(command + ["visitor_logs", "--workers", "2", *args], cwd=workdir, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+
+def write_logs(workdir, rows):
+    df = pd.DataFrame(rows)
+    for day, part in df.groupby(df["timestamp"].str[:10]):
+        year, month, dd = day.split("-")
+        folder = os.path.join(workdir, "visitor_logs", year, month)
+        os.makedirs(folder, exist_ok=True)
+        # The oldest day uses the legacy DD.xlsx name, which the merge rewrites as visitor_DD.xlsx
+        name = f"{dd}.xlsx" if day == "2025-06-30" else f"visitor_{dd}.xlsx"
+        part.to_excel(os.path.join(folder, name), index=False)
+
+
+def test_killed_import_of_visitor_logs_resumes(tmp_path):
+    rows = make_visits(400, days=4, start="2025-06-30")
+    write_logs(tmp_path, rows)
+
+    killed = run_import(tmp_path, kill_at=2)
+    assert killed.returncode == 9, killed.stdout + killed.stderr
+    assert os.path.exists(tmp_path / "visitor_logs" / "2025" / "06" / "visitor_30.xlsx")
+
+    resumed = run_import(tmp_path)
+    assert resumed.returncode == 0, resumed.stdout + resumed.stderr
+    assert "Resuming" in resumed.stdout
+
+    stored = VisitStore(str(tmp_path / "visit_store")).read_all()
+    assert len(stored) == len(rows)
+    assert not stored.duplicated().any()
+    for day in ("2025-07-01", "2025-07-02"):
+        log = pd.read_excel(tmp_path / "visitor_logs" / "2025" / "07" / f"visitor_{day[-2:]}.xlsx")
+        assert len(log) == sum(r["timestamp"].startswith(day) for r in rows)
+
+    again = run_import(tmp_path)
+    assert again.returncode == 0, again.stdout + again.stderr
+    assert "already completed" in again.stdout
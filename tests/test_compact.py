@@ -0,0 +1,66 @@
+import math
+
+import pandas as pd
+
+from compact import VisitTable, compact_users, epoch_to_ist, ist_to_epoch
+from testing.synthetic import make_visits
+
+ROWS = make_visits(500, days=3, seed=4)
+
+
+def test_timestamps_are_stored_as_utc_epochs():
+    assert ist_to_epoch("2025-07-01 05:30:00") == 1751328000  # 2025-07-01 00:00 UTC
+    assert epoch_to_ist(1751328000) == "2025-07-01 05:30:00"
+    assert epoch_to_ist(ist_to_epoch("2024-02-29 23:59:59")) == "2024-02-29 23:59:59"
+
+    table = VisitTable.from_records(ROWS)
+    assert list(table.epochs()) == [ist_to_epoch(r["timestamp"]) for r in ROWS]
+    assert table.column("timestamp") == [r["timestamp"] for r in ROWS]
+
+
+def test_strings_are_dictionary_encoded():
+    table = VisitTable.from_records(ROWS)
+    for column in ("email", "ip", "user_agent"):
+        pool = table.pool(column)
+        assert sorted(pool.values) == sorted({r[column] for r in ROWS})  # each value kept once
+        assert [pool.values[c] for c in table.codes(column)] == [r[column] for r in ROWS]
+        assert table.value_counts(column) == pd.Series([r[column] for r in ROWS]).value_counts().to_dict()
+    assert table.pool("email").code("nobody@example.com") is None
+
+
+def test_from_frame_matches_from_records():
+    by_frame = VisitTable.from_frame(pd.DataFrame(ROWS))
+    by_rows = VisitTable.from_records(ROWS)
+    assert list(by_frame) == list(by_rows) == ROWS
+    assert by_frame.to_frame().equals(pd.DataFrame(ROWS))
+    assert by_rows.to_frame().equals(pd.DataFrame(ROWS))
+
+
+def test_sort_keys_order_like_the_values():
+    table = VisitTable.from_records(ROWS)
+    for column in ("email", "ip", "timestamp", "user_agent"):
+        keys, values = table.sort_keys(column), table.column(column)
+        assert sorted(range(len(table)), key=keys.__getitem__) == sorted(range(len(table)), key=values.__getitem__)
+
+
+def test_extended_versions_share_storage_and_keep_their_rows():
+    old = VisitTable.from_records(ROWS[:300])
+    new = old.extended(ROWS[300:])
+    assert new.continues(old)
+    assert new.pool("email") is old.pool("email")  # appended in place, not copied
+    assert len(old) == 300
+    assert list(old) == ROWS[:300]
+    assert old.to_frame().equals(pd.DataFrame(ROWS[:300]))
+    assert list(new) == ROWS
+
+    # Extending an older version branches off with its own copies
+    branch = old.extended(make_visits(5, start="2025-08-01", seed=9))
+    assert not branch.continues(old)
+    assert list(branch)[:300] == ROWS[:300]
+    assert list(new) == ROWS
+    assert list(old) == ROWS[:300]
+
+
+def test_compact_users_blanks_missing_fields():
+    (user,) = compact_users([{"email": "a@example.com", "name": None, "phone": math.nan, "role": "admin"}])
+    assert user.as_dict() == {"email": "a@example.com", "name": "", "phone": "", "role": "admin", "created_at": ""}
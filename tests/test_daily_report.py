@@ -0,0 +1,107 @@
+import email
+import os
+import socket
+import threading
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+import pytz
+from aiosmtpd.controller import Controller
+
+from testing.synthetic import make_visits
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield inbox, port
+    controller.stop()
+
+
+def test_send_daily_report_mails_todays_report(app, smtp_server, monkeypatch):
+    inbox, port = smtp_server
+    monkeypatch.setitem(app.app.config, "MAIL_SERVER", "127.0.0.1")
+    monkeypatch.setitem(app.app.config, "MAIL_PORT", port)
+    monkeypatch.setitem(app.app.config, "MAIL_USE_TLS", False)
+    monkeypatch.setattr(app, "mail", None)
+    monkeypatch.setattr(app, "REPORT_RECIPIENTS", ["ops@example.com"])
+    monkeypatch.setenv("GMAIL_USER", "reports@example.com")
+    # The full-history export is its own job, not part of the email
+    monkeypatch.setattr(app, "export_all_excel", lambda: pytest.fail("exported the full history"))
+
+    today = datetime.now(pytz.timezone("Asia/Kolkata")).strftime("%Y-%m-%d")
+    rows = make_visits(30, start=today) + make_visits(5, start="2025-07-01", seed=1)
+    app.visit_store.append(pd.DataFrame(rows))
+
+    app.send_daily_report()
+
+    (message,) = inbox.messages
+    assert message["To"] == "ops@example.com"
+    assert today in message["Subject"]
+    body, attachment = [part for part in message.walk() if not part.is_multipart()]
+    totals = app.get_rollups().daily(today, today)["totals"]
+    text = body.get_payload(decode=True).decode()
+    assert "Visits: 30" in text
+    assert f"Unique emails: {totals['unique_emails']}" in text
+    assert f"Unique IPs: {totals['unique_ips']}" in text
+
+    assert attachment.get_filename() == f"visitor_report_{today}.xlsx"
+    with open("attached.xlsx", "wb") as f:
+        f.write(attachment.get_payload(decode=True))
+    wb = openpyxl.load_workbook("attached.xlsx", read_only=True)
+    summary = dict(wb["Summary"].iter_rows(values_only=True))
+    assert summary["Date"] == today
+    assert summary["Visits"] == 30
+    assert len(list(wb["Visits"].iter_rows())) == 31  # header + only today's visits
+
+
+def test_workers_building_the_same_report_do_not_collide(tmp_path):
+    from daily_report import ReportCache, write_report
+    from rollups import TrafficRollups
+
+    day = "2025-07-01"
+    visits = pd.DataFrame(make_visits(200, start=day))
+    rollups = TrafficRollups()
+    rollups.add_frame(visits)
+    totals = rollups.daily(day, day)["totals"]
+
+    def build(path):
+        write_report(path, day, visits, rollups.hourly(day), totals)
+
+    # One cache per worker process: each has its own lock, so only the files keep them apart
+    caches = [ReportCache(str(tmp_path)) for _ in range(4)]
+    errors = []
+
+    def worker(cache):
+        try:
+            for visits_seen in range(10):
+                cache.get(day, visits_seen, build)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(cache,)) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["index.json", f"visitor_report_{day}.xlsx"]
+    wb = openpyxl.load_workbook(tmp_path / f"visitor_report_{day}.xlsx", read_only=True)
+    assert dict(wb["Summary"].iter_rows(values_only=True))["Visits"] == 200
@@ -0,0 +1,84 @@
+import threading
+
+from testing.fake_drive import FakeDriveService
+from drive_sync import DriveSync
+from upload_queue import UploadQueue
+
+
+def make_sync(tmp_path, drive):
+    return DriveSync(drive, "folder", str(tmp_path / "drive_index.json"), poll_interval=0)
+
+
+def test_unchanged_file_is_not_uploaded_again(tmp_path):
+    drive = FakeDriveService()
+    sync = make_sync(tmp_path, drive)
+    path = tmp_path / "visitor_data.xlsx"
+    path.write_bytes(b"v1")
+
+    assert sync.upload(str(path))
+    calls = sum(drive.calls.values())
+    assert not sync.upload(str(path))
+    assert sum(drive.calls.values()) == calls
+
+    path.write_bytes(b"v2, longer")
+    assert sync.upload(str(path))
+    assert drive.calls["files.update"] == 1
+    assert len(drive.files_by_id) == 1
+
+
+def test_index_survives_a_restart(tmp_path):
+    drive = FakeDriveService()
+    path = tmp_path / "user_data.xlsx"
+    path.write_bytes(b"users")
+    make_sync(tmp_path, drive).upload(str(path))
+    drive.calls.clear()
+
+    restarted = make_sync(tmp_path, drive)
+    assert not restarted.upload(str(path))
+    assert not drive.calls
+
+    # A known file is updated by ID, without a files().list lookup
+    path.write_bytes(b"more users")
+    assert restarted.upload(str(path))
+    assert drive.calls == {"files.update": 1}
+
+
+def test_remote_edits_come_from_the_changes_feed(tmp_path):
+    drive = FakeDriveService()
+    sync = make_sync(tmp_path, drive)
+    path = tmp_path / "visitor_data.xlsx"
+    path.write_bytes(b"local")
+    sync.upload(str(path))
+    assert sync.poll_changes() == set()  # starts the feed
+
+    assert not sync.download_if_changed("visitor_data.xlsx", str(path))
+    drive.edit(sync.entry("visitor_data.xlsx")["id"], b"edited on Drive")
+    drive.calls.clear()
+
+    assert sync.download_if_changed("visitor_data.xlsx", str(path))
+    assert path.read_bytes() == b"edited on Drive"
+    assert drive.calls["changes.list"] == 1
+    assert drive.calls["files.list"] == 0
+    assert not sync.download_if_changed("visitor_data.xlsx", str(path))
+
+
+def test_upload_queue_coalesces_repeated_submits():
+    started, release = threading.Event(), threading.Event()
+    uploaded = []
+
+    def upload(path):
+        uploaded.append(path)
+        if path == "a.xlsx" and not started.is_set():
+            started.set()
+            release.wait(5)
+
+    queue = UploadQueue(upload, workers=1)
+    queue.submit("a.xlsx")
+    assert started.wait(5)
+    for _ in range(3):
+        queue.submit("a.xlsx")  # while uploading: one more upload afterwards
+        queue.submit("b.xlsx")  # while waiting: queued once
+    release.set()
+
+    assert queue.join(timeout=5)
+    assert sorted(uploaded) == ["a.xlsx", "a.xlsx", "b.xlsx"]
@@ -0,0 +1,55 @@
+import gzip
+import io
+import os
+
+import pandas as pd
+
+from testing.synthetic import make_visits
+
+
+def login(client):
+    with client.session_transaction() as session:
+        session["user"] = "admin"
+
+
+def test_download_all_streams_csv_by_default(app):
+    rows = make_visits(300, days=3)
+    app.visit_store.append(pd.DataFrame(rows))
+    client = app.app.test_client()
+    login(client)
+
+    response = client.get("/download-all", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Encoding"] == "gzip"
+    df = pd.read_csv(io.BytesIO(gzip.decompress(response.get_data())), dtype=str, keep_default_na=False)
+    assert df.to_dict(orient="records") == rows
+
+    # Excel is still there on request
+    response = client.get("/download-all?format=xlsx")
+    assert response.mimetype == app.EXPORT_MIMETYPES["xlsx"]
+    assert len(pd.read_excel(io.BytesIO(response.get_data()))) == len(rows)
+
+
+def test_nightly_export_streams_the_store(app, monkeypatch):
+    rows = make_visits(500, days=4)
+    app.visit_store.append(pd.DataFrame(rows))
+    uploaded = []
+    monkeypatch.setattr(app, "upload_to_drive", uploaded.append)
+    monkeypatch.setattr(app.visit_store, "read_all", None)  # never the whole history at once
+
+    app.export_all_excel()
+    assert uploaded == [app.EXCEL_ALL_FILE]
+    df = pd.read_excel(app.EXCEL_ALL_FILE, dtype=str, keep_default_na=False)
+    assert df.to_dict(orient="records") == rows
+
+    # Same rows: the rebuilt workbook is dropped and not uploaded again
+    app.export_all_excel()
+    assert uploaded == [app.EXCEL_ALL_FILE]
+    assert [name for name in os.listdir() if name.endswith(".xlsx")] == [app.EXCEL_ALL_FILE]
+
+    app.visit_store.append(pd.DataFrame(make_visits(10, start="2025-07-05", seed=1)))
+    app.export_all_excel()
+    assert uploaded == [app.EXCEL_ALL_FILE] * 2
+    assert len(pd.read_excel(app.EXCEL_ALL_FILE)) == len(rows) + 10
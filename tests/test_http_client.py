@@ -0,0 +1,73 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from testing.stub_api import StubAPI
+from testing.synthetic import make_raw_visits
+from http_client import ConditionalClient
+
+
+@pytest.fixture
+def stub():
+    stub = StubAPI(make_raw_visits(200), [{"email": "a@example.com"}]).start()
+    yield stub
+    stub.stop()
+
+
+def test_matching_etag_answers_304(stub):
+    client = ConditionalClient()
+    url = stub.url("/admin/users")
+
+    first = client.get(url)
+    assert first.status_code == 200
+    # Not processed yet: the same request is answered in full again
+    assert client.get(url).status_code == 200
+
+    client.mark_processed(first)
+    assert client.get(url) is None
+    assert stub.requests[-1] == ("/admin/users", 304)
+
+    stub.users.append({"email": "b@example.com"})
+    assert len(client.get(url).json()) == 2
+
+
+def test_gzip_body_is_decoded(stub):
+    response = ConditionalClient().get(stub.url("/admin/visits"))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == stub.visits
+
+
+def test_pool_reuses_connections_under_concurrent_fetches(stub):
+    client = ConditionalClient(pool_size=4)
+    url = stub.url("/admin/visits")
+    with ThreadPoolExecutor(4) as pool:
+        bodies = list(pool.map(lambda _: client.get(url).json(), range(40)))
+
+    assert all(body == stub.visits for body in bodies)
+    pools = client.session.get_adapter(url).poolmanager.pools
+    (key,) = pools.keys()
+    connections = pools[key]
+    assert connections.num_requests == 40
+    assert 1 <= connections.num_connections <= 4  # over at most pool_size sockets
+
+
+def test_failed_fetch_keeps_the_cursor(app, stub):
+    app.DATA_URL = stub.url("/admin/visits")
+    app.USER_DATA_URL = stub.url("/admin/users")
+    app.continuous_fetch()
+    with open(app.FETCH_CURSOR_FILE) as f:
+        cursor = json.load(f)
+    assert cursor["timestamp"]
+
+    stub.add_visits(make_raw_visits(10, start="2025-07-02", seed=1))
+    app.DATA_URL = stub.url("/admin/missing")  # 404
+    app.continuous_fetch()
+    with open(app.FETCH_CURSOR_FILE) as f:
+        assert json.load(f) == cursor
+
+    app.DATA_URL = stub.url("/admin/visits")
+    app.continuous_fetch()
+    with open(app.FETCH_CURSOR_FILE) as f:
+        assert json.load(f)["timestamp"] > cursor["timestamp"]
+    assert len(app.get_snapshot().visits) == 210
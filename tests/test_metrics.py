@@ -0,0 +1,15 @@
+def test_metrics_without_token_are_local_only(app, monkeypatch):
+    monkeypatch.setattr(app, "METRICS_TOKEN", None)
+    client = app.app.test_client()
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.7"}).status_code == 403
+    assert client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 403
+
+
+def test_metrics_token(app, monkeypatch):
+    monkeypatch.setattr(app, "METRICS_TOKEN", "s3cret")
+    client = app.app.test_client()
+    remote = {"REMOTE_ADDR": "203.0.113.7"}
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics?token=s3cret", environ_base=remote).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
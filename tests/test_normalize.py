@@ -0,0 +1,24 @@
+import pandas as pd
+
+from compact import VisitTable
+from normalize import VISIT_COLUMNS, normalize_frame
+
+
+def visits(timestamps):
+    return pd.DataFrame([{"email": "a@example.com", "ip": "10.0.0.1", "timestamp": ts, "user_agent": "curl/8"}
+                         for ts in timestamps], columns=VISIT_COLUMNS)
+
+
+def test_all_midnight_batch_keeps_the_time():
+    df = normalize_frame(visits(["2025-07-02 00:00:00", "2025-07-03 00:00:00"]), utc=False)
+    assert df["timestamp"].tolist() == ["2025-07-02 00:00:00", "2025-07-03 00:00:00"]
+    # API timestamps are UTC: 18:30Z is midnight IST
+    df = normalize_frame(visits(["2025-07-01T18:30:00Z"]))
+    assert df["timestamp"].tolist() == ["2025-07-02 00:00:00"]
+    VisitTable.from_records(df.to_dict(orient="records"))  # parses every timestamp
+
+
+def test_unparseable_timestamps_are_dropped():
+    df = normalize_frame(visits(["2025-07-01T10:00:00Z", "yesterday", None]))
+    assert df["timestamp"].tolist() == ["2025-07-01 15:30:00"]
+    assert df["email"].tolist() == ["a@example.com"]
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from rollups import ANONYMOUS_EMAILS, TrafficRollups
+from testing.synthetic import make_visits
+from visit_store import VisitStore
+
+
+def test_incremental_adds_match_a_rebuild_from_the_store(tmp_path):
+    rows = make_visits(1500, days=4, start="2025-07-01", seed=5)
+    rows[10]["email"] = rows[11]["ip"] = ""  # blanks are not visitors either
+    store = VisitStore(str(tmp_path / "visit_store"))
+    incremental = TrafficRollups()
+    # Ticks: batches of varying size, several per hour, each appended then folded in
+    for start, stop in [(0, 1), (1, 200), (200, 777), (777, 778), (778, 1500)]:
+        batch = rows[start:stop]
+        store.append(pd.DataFrame(batch))
+        incremental.add(batch)
+
+    rebuilt = TrafficRollups()
+    rebuilt.add_frame(store.read_all())
+
+    assert incremental.days() == rebuilt.days() == ["2025-07-01", "2025-07-02", "2025-07-03", "2025-07-04"]
+    assert incremental.daily() == rebuilt.daily()
+    assert incremental.daily("2025-07-02", "2025-07-03") == rebuilt.daily("2025-07-02", "2025-07-03")
+    for day in rebuilt.days():
+        assert incremental.hourly(day) == rebuilt.hourly(day)
+
+    # And both match counting the rows directly
+    df = pd.DataFrame(rows)
+    totals = rebuilt.daily()["totals"]
+    assert totals["visits"] == len(df)
+    assert totals["unique_emails"] == df.loc[~df["email"].isin(ANONYMOUS_EMAILS), "email"].nunique()
+    assert totals["unique_ips"] == df.loc[df["ip"] != "", "ip"].nunique()
+    assert sum(totals["devices"].values()) == len(df)
+    day = df[df["timestamp"].str.startswith("2025-07-02")]
+    (row,) = rebuilt.daily("2025-07-02", "2025-07-02")["days"]
+    assert (row["visits"], row["unique_ips"]) == (len(day), day["ip"].nunique())
+    assert sum(h["visits"] for h in rebuilt.hourly("2025-07-02")) == len(day)
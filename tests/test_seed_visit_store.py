@@ -0,0 +1,16 @@
+import pandas as pd
+
+
+def test_seed_drops_rows_with_bad_timestamps(app):
+    pd.DataFrame([
+        {"email": "a@example.com", "ip": "10.0.0.1", "timestamp": "2025-07-01 10:00:00", "user_agent": "curl/8"},
+        {"email": "b@example.com", "ip": "10.0.0.2", "timestamp": "not a time", "user_agent": "curl/8"},
+        {"email": "", "ip": "10.0.0.3", "timestamp": "2025-07-02 00:00:00", "user_agent": ""},
+    ]).to_excel(app.EXCEL_ALL_FILE, index=False)
+
+    app.seed_visit_store()
+
+    stored = app.visit_store.read_all().sort_values("timestamp")
+    assert stored["timestamp"].tolist() == ["2025-07-01 10:00:00", "2025-07-02 00:00:00"]
+    assert stored["email"].tolist() == ["a@example.com", ""]
+    assert app.get_snapshot().total_visits == 2  # the startup snapshot parses every timestamp
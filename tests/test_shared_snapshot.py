@@ -0,0 +1,30 @@
+from testing.synthetic import make_visits
+from compact import VisitTable
+from shared_snapshot import SnapshotFile
+
+
+def test_follower_extends_mapped_table(tmp_path):
+    rows = make_visits(50, days=2)
+    SnapshotFile(str(tmp_path / "shared_snapshot.bin")).write(VisitTable.from_records(rows[:40]), (), {})
+
+    shared = SnapshotFile(str(tmp_path / "shared_snapshot.bin")).read_if_changed()
+    assert isinstance(shared.visits.epochs(), memoryview)
+
+    extended = shared.visits.extended(rows[40:])
+    assert list(extended) == rows
+    assert list(shared.visits) == rows[:40]  # the mapping itself is untouched
+
+
+def test_appended_version_is_marked(tmp_path):
+    path = str(tmp_path / "shared_snapshot.bin")
+    rows = make_visits(30)
+    leader, follower = SnapshotFile(path), SnapshotFile(path)
+    table = VisitTable.from_records(rows[:20])
+    leader.write(table, (), {})
+    assert follower.read_if_changed().appended_from is None
+    assert follower.read_if_changed() is None
+
+    leader.write(table.extended(rows[20:]), (), {})
+    shared = follower.read_if_changed()
+    assert shared.appended_from == 20
+    assert list(shared.visits) == rows
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+from sqlite_store import SqliteStore
+from testing.synthetic import make_visits
+
+ROWS = make_visits(600, days=3, start="2025-07-01")
+
+
+def frame(rows):
+    return pd.DataFrame(rows)[["email", "ip", "timestamp", "user_agent"]]
+
+
+def test_append_deduplicates_and_reads_by_day(tmp_path):
+    store = SqliteStore(str(tmp_path / "visits.db"))
+    assert store.is_empty()
+    assert store.append(ROWS[:400]) == ["2025-07-01", "2025-07-02"]
+    assert store.append(ROWS) == ["2025-07-01", "2025-07-02", "2025-07-03"]  # first 400 ignored
+
+    everything = store.read_all()
+    assert len(everything) == len(ROWS)
+    assert everything.equals(frame(ROWS).sort_values("timestamp", kind="stable").reset_index(drop=True))
+    assert store.days("2025-07-02") == ["2025-07-02", "2025-07-03"]
+
+    day = store.read_day("2025-07-02")
+    assert set(day["timestamp"].str[:10]) == {"2025-07-02"}
+    assert len(day) == sum(r["timestamp"].startswith("2025-07-02") for r in ROWS)
+    assert len(store.read_range("2025-07-02", "2025-07-03")) == sum(r["timestamp"] >= "2025-07-02" for r in ROWS)
+    assert store.read_range("2025-08-01").empty
+
+    batches = list(store.iter_batches("2025-07-01", "2025-07-02", batch_rows=150))
+    assert [len(b) for b in batches] == [150, 150, 100]
+    assert pd.concat(batches, ignore_index=True).equals(store.read_range("2025-07-01", "2025-07-02"))
+
+
+def test_data_survives_a_restart(tmp_path):
+    path = str(tmp_path / "visits.db")
+    store = SqliteStore(path)
+    store.append(ROWS)
+    store.upsert_users([{"email": "a@example.com", "name": "A"}, {"email": "b@example.com", "name": "B"}])
+    store.compact()
+
+    reopened = SqliteStore(path)
+    assert reopened.days() == ["2025-07-01", "2025-07-02", "2025-07-03"]
+    assert reopened.read_all().equals(store.read_all())
+    assert reopened.read_users()["email"].tolist() == ["a@example.com", "b@example.com"]
+
+
+def test_users_upsert_only_changed_rows(tmp_path):
+    store = SqliteStore(str(tmp_path / "visits.db"))
+    users = [{"email": "a@example.com", "name": "A"}, {"email": "b@example.com", "role": "admin"}]
+    assert store.upsert_users(users) == 2
+    assert store.upsert_users(users) == 0  # unchanged rows are not rewritten
+    assert store.upsert_users([{"email": "a@example.com", "name": "A2"}, {"email": ""}]) == 1
+    assert store.delete_users(["b@example.com", "nobody@example.com"]) == 1
+    assert store.read_users().to_dict(orient="records") == [
+        {"email": "a@example.com", "name": "A2", "phone": "", "role": "", "created_at": ""}]
+
+
+def test_readers_are_not_blocked_by_a_writer(tmp_path):
+    path = str(tmp_path / "visits.db")
+    store = SqliteStore(path)
+    store.append(ROWS[:300])
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    # Another process holds the write lock with uncommitted rows
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.executemany("INSERT INTO visits VALUES (?, ?, ?, ?)",
+                       frame(ROWS[300:]).itertuples(index=False, name=None))
+
+    # A request thread still reads the last committed state, without waiting
+    seen = []
+    reader = threading.Thread(target=lambda: seen.append(len(store.read_all())))
+    reader.start()
+    reader.join(timeout=5)
+    assert seen == [300]
+
+    # A scan that started before the commit keeps its snapshot
+    batches = store.iter_batches(batch_rows=100)
+    first = next(batches)
+    writer.execute("COMMIT")
+    assert len(first) + sum(len(b) for b in batches) == 300
+    store.refresh()
+    assert len(store.read_all()) == len(ROWS)
+    assert store.days() == ["2025-07-01", "2025-07-02", "2025-07-03"]
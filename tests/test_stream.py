@@ -0,0 +1,47 @@
+import asyncio
+
+
+def login(client):
+    with client.session_transaction() as session:
+        session["user"] = "admin"
+
+
+def test_wsgi_stream_tells_the_page_to_stop_reconnecting(app):
+    client = app.app.test_client()
+    assert client.get("/stream").status_code == 401
+    login(client)
+    response = client.get("/stream")
+    assert response.status_code == 204
+    assert len(app.feed) == 0
+
+
+def test_asgi_stream_pushes_updates(app):
+    import asgi
+
+    client = app.app.test_client()
+    login(client)
+    cookie = client.get_cookie(app.app.config["SESSION_COOKIE_NAME"])
+    scope = {"type": "http", "path": "/stream", "method": "GET",
+             "headers": [(b"cookie", f"{cookie.key}={cookie.value}".encode())]}
+
+    async def run():
+        sent, disconnect = [], asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 2:  # headers and the retry hint: subscribed
+                app.feed.publish("update", {"total_visits": 1})
+            elif len(sent) == 3:
+                disconnect.set()
+
+        await asyncio.wait_for(asgi.stream(scope, receive, send), 5)
+        return sent
+
+    start, _, update = asyncio.run(run())
+    assert start["status"] == 200
+    assert update["body"] == b'event: update\ndata: {"total_visits":1}\n\n'
+    assert len(app.feed) == 0
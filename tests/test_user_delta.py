@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from compact import compact_users
+from testing.stub_api import StubAPI
+from user_delta import apply_delta, diff_users, hash_users
+
+USERS = [
+    {"email": "a@example.com", "name": "A", "phone": "1", "role": "admin", "created_at": "2025-07-01"},
+    {"email": "b@example.com", "name": "B", "phone": "2", "role": "user", "created_at": "2025-07-01"},
+    {"email": "c@example.com", "name": "C", "phone": "3", "role": "user", "created_at": "2025-07-02"},
+]
+
+
+def emails(records):
+    return [r.email for r in records]
+
+
+def last_status(stub, path):
+    return [status for requested, status in stub.requests if requested == path][-1]
+
+
+def test_second_fetch_yields_added_changed_and_removed():
+    first = compact_users(USERS)
+    delta = diff_users({}, first)
+    assert emails(delta.added) == emails(first)
+    records = apply_delta((), delta)
+    assert records == first
+
+    second = compact_users([
+        dict(USERS[2], name="C. Changed"),
+        USERS[0],
+        {"email": "d@example.com", "name": "D"},
+    ])
+    delta = diff_users(delta.hashes, second)
+    assert str(delta) == "+1 ~1 -1"
+    assert emails(delta.added) == ["d@example.com"]
+    assert emails(delta.changed) == ["c@example.com"]
+    assert delta.removed == ["b@example.com"]
+
+    records = apply_delta(records, delta)
+    # Kept users keep their place, changed ones are replaced there, new ones go last
+    assert emails(records) == ["a@example.com", "c@example.com", "d@example.com"]
+    assert records[0] is first[0]
+    assert records[1].name == "C. Changed"
+    assert delta.hashes == hash_users(records)
+
+
+def test_unchanged_fetch_is_an_empty_delta():
+    known = hash_users(compact_users(USERS))
+    delta = diff_users(known, compact_users(reversed(USERS)))  # order does not matter
+    assert not delta
+    assert str(delta) == "+0 ~0 -0"
+    assert delta.hashes == known
+
+
+def test_repeated_email_keeps_the_last_record():
+    delta = diff_users({}, compact_users([USERS[0], dict(USERS[0], name="Again")]))
+    assert [r.name for r in delta.added] == ["Again"]
+
+
+@pytest.fixture
+def users_api(app, monkeypatch):
+    stub = StubAPI(users=[dict(u) for u in USERS]).start()
+    monkeypatch.setattr(app, "DATA_URL", stub.url("/admin/visits"))
+    monkeypatch.setattr(app, "USER_DATA_URL", stub.url("/admin/users"))
+    saved = []
+    save_users = app.save_users
+    monkeypatch.setattr(app, "save_users", lambda records, delta: saved.append(str(delta)) or save_users(records, delta))
+    yield stub, saved
+    stub.stop()
+
+
+def test_ticks_only_write_users_when_they_change(app, users_api):
+    stub, saved = users_api
+
+    app.ingest_tick()
+    assert saved == ["+3 ~0 -0"]
+    assert pd.read_excel(app.EXCEL_USERS_FILE)["email"].tolist() == emails(compact_users(USERS))
+
+    # Same users: the API answers 304 and nothing is diffed or written
+    app.ingest_tick()
+    assert last_status(stub, "/admin/users") == 304
+    assert saved == ["+3 ~0 -0"]
+
+    # The body changes but the users do not (reordered): fetched, diffed, not written
+    stub.users.reverse()
+    app.ingest_tick()
+    assert last_status(stub, "/admin/users") == 200
+    assert saved == ["+3 ~0 -0"]
+
+    stub.users[:] = [dict(USERS[0], role="user"), USERS[2]]
+    app.ingest_tick()
+    assert saved == ["+3 ~0 -0", "+0 ~1 -1"]
+    assert [u.as_dict() for u in app.get_snapshot().users] == [dict(USERS[0], role="user"), USERS[2]]
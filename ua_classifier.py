@@ -0,0 +1,101 @@
+"""User-agent classification shared by the index and dashboard views.
+
+User-agent strings repeat heavily, so each distinct string is classified
+once and cached; bulk paths work on the distinct values of a column.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+UserAgentInfo = namedtuple("UserAgentInfo", ["device", "browser", "os"])
+
+DEVICES = ("Desktop", "Mobile", "Other")
+
+_MOBILE = re.compile(r"mobile", re.I)
+_DESKTOP = re.compile(r"windows|macintosh|linux", re.I)
+
+# First match wins, so more specific patterns come first
+_BROWSERS = [
+    ("Bot", re.compile(r"bot|crawl|spider|slurp", re.I)),
+    ("Edge", re.compile(r"Edg(e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Samsung Internet", re.compile(r"SamsungBrowser/")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Version/[\d.]+.*Safari/")),
+    ("HTTP client", re.compile(r"python-requests|Go-http-client|curl/|Wget|okhttp|axios", re.I)),
+]
+_OSES = [
+    ("Android", re.compile(r"Android")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod")),
+    ("Windows", re.compile(r"Windows")),
+    ("ChromeOS", re.compile(r"CrOS")),
+    ("macOS", re.compile(r"Macintosh|Mac OS X")),
+    ("Linux", re.compile(r"Linux")),
+]
+
+
+def _first_match(patterns, user_agent):
+    for name, pattern in patterns:
+        if pattern.search(user_agent):
+            return name
+    return "Other"
+
+
+@lru_cache(maxsize=4096)
+def classify(user_agent):
+    """Classify one user-agent string into device, browser and OS."""
+    user_agent = "" if user_agent is None else str(user_agent)
+    if _MOBILE.search(user_agent):
+        device = "Mobile"
+    elif _DESKTOP.search(user_agent):
+        device = "Desktop"
+    else:
+        device = "Other"
+    return UserAgentInfo(device, _first_match(_BROWSERS, user_agent), _first_match(_OSES, user_agent))
+
+
+def classify_series(user_agents):
+    """Classify a column of user agents, one lookup per distinct value."""
+    series = pd.Series(user_agents).fillna("").astype(str)
+    codes, uniques = pd.factorize(series)
+    infos = pd.DataFrame([classify(u) for u in uniques], columns=UserAgentInfo._fields)
+    return infos.iloc[codes].set_index(series.index)
+
+
+def empty_counts():
+    return {"device": dict.fromkeys(DEVICES, 0), "browser": {}, "os": {}}
+
+
+def summarize(user_agents):
+    """Device/browser/OS counts for an iterable of user agents."""
+    counts = empty_counts()
+    for user_agent in user_agents:
+        info = classify(user_agent)
+        counts["device"][info.device] += 1
+        counts["browser"][info.browser] = counts["browser"].get(info.browser, 0) + 1
+        counts["os"][info.os] = counts["os"].get(info.os, 0) + 1
+    return counts
+
+
+def summarize_counts(agent_counts):
+    """Same as summarize, from (user_agent, occurrences) pairs."""
+    counts = empty_counts()
+    for user_agent, n in agent_counts:
+        info = classify(user_agent)
+        counts["device"][info.device] += int(n)
+        counts["browser"][info.browser] = counts["browser"].get(info.browser, 0) + int(n)
+        counts["os"][info.os] = counts["os"].get(info.os, 0) + int(n)
+    return counts
+
+
+def merge_counts(a, b):
+    return {
+        group: {k: a[group].get(k, 0) + b[group].get(k, 0) for k in a[group].keys() | b[group].keys()}
+        for group in ("device", "browser", "os")
+    }
@@ -0,0 +1,118 @@
+"""Background upload queue that coalesces repeat requests for the same file.
+
+submit() only records the path and returns. A small pool of worker
+threads drains the queue; a path that is already waiting is not queued
+twice, and a path re-submitted while it is uploading is uploaded once
+more afterwards so the latest content always lands. Rate-limit and
+transient errors are retried with exponential backoff and jitter.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from lazy import lazy_import
+
+google_errors = lazy_import("googleapiclient.errors")
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+def is_retryable(error):
+    if isinstance(error, google_errors.HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUS:
+            return True
+        return status == 403 and any(r in str(error.content) for r in RATE_LIMIT_REASONS)
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def retry_after(error):
+    # Drive sometimes tells us how long to back off
+    if isinstance(error, google_errors.HttpError):
+        try:
+            return float(error.resp.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class UploadQueue:
+    def __init__(self, upload_fn, workers=2, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.upload_fn = upload_fn
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # paths waiting, oldest first
+        self._in_flight = set()
+        self._resubmitted = set()  # submitted again while uploading
+        self._threads = []
+
+    def submit(self, path):
+        with self._cond:
+            if not self._threads:
+                self._start()
+            if path in self._in_flight:
+                self._resubmitted.add(path)
+            elif path not in self._pending:
+                self._pending[path] = None
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return list(self._pending) + sorted(self._in_flight)
+
+    def join(self, timeout=None):
+        """Wait until everything submitted so far has been attempted."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"drive-upload-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path, _ = self._pending.popitem(last=False)
+                self._in_flight.add(path)
+
+            self._upload_with_backoff(path)
+
+            with self._cond:
+                self._in_flight.discard(path)
+                if path in self._resubmitted:
+                    self._resubmitted.discard(path)
+                    self._pending[path] = None
+                self._cond.notify_all()
+
+    def _upload_with_backoff(self, path):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.upload_fn(path)
+                return
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    metrics.inc("uploads_total", result="failed")
+                    print(f"❌ Upload to Drive failed: {path}: {e}")
+                    return
+                metrics.inc("uploads_total", result="retried")
+                delay = retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay *= 0.5 + random.random()
+                print(f"⏳ Drive busy, retrying {path} in {delay:.1f}s: {e}")
+                time.sleep(delay)
@@ -0,0 +1,74 @@
+"""Diff fetched users against what is stored, keyed by email.
+
+Each record gets a content hash, so a tick compares one hash per user
+instead of rewriting users.xlsx:
+
+    delta = diff_users(user_hashes, incoming)
+    if delta:
+        records = apply_delta(fetched_users, delta)
+
+An empty delta means nothing is written or uploaded.
+"""
+import hashlib
+
+from compact import UserRecord
+
+FIELDS = UserRecord.__slots__
+
+
+def record_hash(record):
+    """Stable digest of a UserRecord's fields."""
+    payload = "\x1f".join(getattr(record, f) for f in FIELDS)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+def hash_users(records):
+    """email -> content hash; the last record wins for a repeated email."""
+    return {r.email: record_hash(r) for r in records}
+
+
+class UserDelta:
+    __slots__ = ("added", "changed", "removed", "hashes")
+
+    def __init__(self, added, changed, removed, hashes):
+        self.added = added      # UserRecords with a new email
+        self.changed = changed  # UserRecords whose content hash changed
+        self.removed = removed  # emails no longer returned by the API
+        self.hashes = hashes    # email -> hash after the delta is applied
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __str__(self):
+        return f"+{len(self.added)} ~{len(self.changed)} -{len(self.removed)}"
+
+
+def diff_users(known, records):
+    """Delta between known hashes (email -> hash) and a full fetched list of UserRecords."""
+    latest = {}
+    for r in records:
+        latest[r.email] = r
+    hashes, added, changed = {}, [], []
+    for email, r in latest.items():
+        h = hashes[email] = record_hash(r)
+        old = known.get(email)
+        if old is None:
+            added.append(r)
+        elif old != h:
+            changed.append(r)
+    removed = [email for email in known if email not in latest]
+    return UserDelta(added, changed, removed, hashes)
+
+
+def apply_delta(records, delta):
+    """New tuple of records: changed ones replaced in place, removed dropped, added appended."""
+    replaced = {r.email: r for r in delta.changed}
+    gone = set(delta.removed)
+    kept, seen = [], set()
+    for r in records:
+        if r.email in gone or r.email in seen:
+            continue
+        seen.add(r.email)
+        kept.append(replaced.get(r.email, r))
+    kept.extend(delta.added)
+    return tuple(kept)
@@ -0,0 +1,233 @@
+"""Sorted indexes over a VisitTable and DataTables server-side queries on top.
+
+A VisitIndex is built for one immutable VisitTable (a dashboard
+snapshot). Sort orders and value lookups are built lazily on first use
+from the table's integer codes and epochs, so a page request only
+decodes the rows it returns. When a new snapshot only appends rows,
+extended() carries over what the previous index already built.
+
+A page never sorts all matching rows: it is sliced straight out of a
+sort order, or picked with a bounded heap or an early-exit walk.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+
+from compact import ist_to_epoch
+
+
+SORTABLE_COLUMNS = ("email", "ip", "timestamp", "user_agent")
+MAX_PAGE_LENGTH = 1000
+
+
+class VisitIndex:
+    def __init__(self, visits):
+        self.visits = visits
+        self._orders = {}
+        self._ranks = {}
+        self._by_value = {}
+        self._epochs = None  # epochs in timestamp order, for bisecting date ranges
+        self._row_epochs = None
+
+    def __len__(self):
+        return len(self.visits)
+
+    def extended(self, visits):
+        """Index for visits, a table that appended rows to this index's table.
+
+        The timestamp order (when new rows come last, as ingest appends them)
+        and the value lookups are extended instead of rebuilt; anything
+        else is rebuilt lazily on first use.
+        """
+        if visits is self.visits:
+            return self
+        index = VisitIndex(visits)
+        if not visits.continues(self.visits):
+            return index
+        old = len(self.visits)
+        new = range(old, len(visits))
+
+        order = self._orders.get("timestamp")
+        if order is not None:
+            epochs = visits.epochs()
+            added = sorted(new, key=epochs.__getitem__)
+            if not order or not added or epochs[added[0]] >= epochs[order[-1]]:
+                index._orders["timestamp"] = order + added
+                if self._epochs is not None:
+                    index._epochs = self._epochs + [epochs[pos] for pos in added]
+                rank = self._ranks.get("timestamp")
+                if rank is not None:
+                    rank = rank + [0] * len(added)
+                    for place, pos in enumerate(added, old):
+                        rank[pos] = place
+                    index._ranks["timestamp"] = rank
+
+        # Copy-on-write: the previous index may still be serving requests, and
+        # building lookups for other columns (so snapshot the column list)
+        for column, by_value in list(self._by_value.items()):
+            codes, values = visits.codes(column), visits.pool(column).values
+            touched = {}
+            for pos in new:
+                touched.setdefault(values[codes[pos]], []).append(pos)
+            by_value = dict(by_value)
+            for value, positions in touched.items():
+                by_value[value] = by_value.get(value, []) + positions
+            index._by_value[column] = by_value
+        return index
+
+    def order(self, column):
+        """Row positions sorted ascending by column (ties keep ingest order)."""
+        order = self._orders.get(column)
+        if order is None:
+            keys = self.visits.sort_keys(column)
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._orders[column] = order
+        return order
+
+    def rank(self, column):
+        """rank[pos] is the place of row pos in order(column)."""
+        rank = self._ranks.get(column)
+        if rank is None:
+            rank = [0] * len(self.visits)
+            for place, pos in enumerate(self.order(column)):
+                rank[pos] = place
+            self._ranks[column] = rank
+        return rank
+
+    def _lookup(self, column):
+        by_value = self._by_value.get(column)
+        if by_value is None:
+            by_code = {}
+            for pos, code in enumerate(self.visits.codes(column)):
+                by_code.setdefault(code, []).append(pos)
+            values = self.visits.pool(column).values
+            by_value = {values[code]: positions for code, positions in by_code.items()}
+            self._by_value[column] = by_value
+        return by_value
+
+    def positions(self, column, value):
+        return self._lookup(column).get(value, [])
+
+    def row_epochs(self):
+        if self._row_epochs is None:
+            self._row_epochs = self.visits.epochs()
+        return self._row_epochs
+
+    def date_bounds(self, date_from=None, date_to=None):
+        """(lo, hi): order("timestamp")[lo:hi] are the visits within [date_from, date_to] (YYYY-MM-DD)."""
+        order = self.order("timestamp")
+        if self._epochs is None:
+            epochs = self.visits.epochs()
+            self._epochs = [epochs[pos] for pos in order]
+        lo = bisect_left(self._epochs, ist_to_epoch(date_from + " 00:00:00")) if date_from else 0
+        hi = bisect_right(self._epochs, ist_to_epoch(date_to + " 23:59:59")) if date_to else len(order)
+        return lo, max(lo, hi)
+
+def select_page(index, column, candidates, contains, start, stop, descending):
+    """Positions start..stop of candidates ordered by column, without sorting all of them.
+
+    contains(pos) tests membership in candidates.
+    """
+    if stop <= start or not candidates:
+        return []
+    if len(candidates) ** 2 > stop * len(index):
+        # Dense: walk the column order from the wanted end, stopping at the page end
+        order = index.order(column)
+        page = []
+        for pos in (reversed(order) if descending else order):
+            if contains(pos):
+                page.append(pos)
+                if len(page) == stop:
+                    break
+        return page[start:]
+    # Sparse: a bounded heap over the candidates' places in that order
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return pick(stop, candidates, key=index.rank(column).__getitem__)[start:]
+
+
+def datatables_query(index, args):
+    """Answer a DataTables server-side processing request from an index.
+
+    Besides the standard draw/start/length/order/search parameters,
+    accepts exact `email` and `ip` filters and a `date_from`/`date_to` range.
+    """
+    total = len(index)
+    draw = int(args.get("draw", 0) or 0)
+    start = max(int(args.get("start", 0) or 0), 0)
+    length = int(args.get("length", 25) or 25)
+    if length < 0 or length > MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+
+    column_no = args.get("order[0][column]", "")
+    column = args.get(f"columns[{column_no}][data]", "timestamp")
+    if column not in SORTABLE_COLUMNS:
+        column = "timestamp"
+    descending = args.get("order[0][dir]", "desc") == "desc"
+
+    # Each filter: (size, positions, test) -- an upper bound on its matches,
+    # a thunk listing them and a membership test on row positions
+    filters = []
+    date_from = args.get("date_from", "").strip()
+    date_to = args.get("date_to", "").strip()
+    if date_from or date_to:
+        lo, hi = index.date_bounds(date_from or None, date_to or None)
+        epochs = index.row_epochs()
+        lo_epoch = ist_to_epoch(date_from + " 00:00:00") if date_from else float("-inf")
+        hi_epoch = ist_to_epoch(date_to + " 23:59:59") if date_to else float("inf")
+        by_time = index.order("timestamp")
+        filters.append((hi - lo, lambda: by_time[lo:hi], lambda pos: lo_epoch <= epochs[pos] <= hi_epoch))
+
+    for name in ("email", "ip"):
+        value = args.get(name, "").strip()
+        if value:
+            positions = index.positions(name, value)
+            filters.append((len(positions), lambda positions=positions: positions, set(positions).__contains__))
+
+    search = args.get("search[value]", "").strip().lower()
+    if search:
+        # Matches distinct emails/IPs once, then tests rows by code
+        tests = []
+        for name in ("email", "ip"):
+            values = index.visits.pool(name).values
+            matched = {code for code, value in enumerate(values) if search in value.lower()}
+            tests.append((index.visits.codes(name), matched))
+        (email_codes, emails), (ip_codes, ips) = tests
+        filters.append((total, lambda: range(total),
+                        lambda pos: email_codes[pos] in emails or ip_codes[pos] in ips))
+
+    stop = start + length
+    dates_only = len(filters) == 1 and bool(date_from or date_to)
+    if not filters or (dates_only and hi - lo == total):
+        order = index.order(column)
+        filtered = total
+        stop = min(stop, total)
+        if descending:
+            page = [order[total - 1 - i] for i in range(start, stop)]
+        else:
+            page = order[start:stop]
+    elif dates_only and column == "timestamp":
+        # A date range alone is a slice of the timestamp order
+        filtered = hi - lo
+        stop = min(stop, filtered)
+        if descending:
+            page = [by_time[hi - 1 - i] for i in range(start, stop)]
+        else:
+            page = by_time[lo + start:lo + stop]
+    else:
+        # List the smallest filter's matches that pass all the others
+        filters.sort(key=lambda f: f[0])
+        tests = [test for _, _, test in filters]
+        first, rest = tests[0], tests[1:]
+        candidates = [pos for pos in filters[0][1]() if first(pos) and all(test(pos) for test in rest)]
+        contains = first if not rest else lambda pos: all(test(pos) for test in tests)
+        filtered = len(candidates)
+        page = select_page(index, column, candidates, contains, start, stop, descending)
+
+    return {
+        "draw": draw,
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [
+            {name: str(visit.get(name, "")) for name in SORTABLE_COLUMNS}
+            for visit in map(index.visits.__getitem__, page)
+        ],
+    }
@@ -0,0 +1,149 @@
+"""Append-only visit store: Parquet segments partitioned by IST date.
+
+Each ingest writes one small segment per touched day, so an append costs
+O(new rows). Days that collect too many segments are compacted into one.
+Excel workbooks are only produced from here on export.
+
+The set of available days is scanned from disk once and then kept in
+memory, so listing partitions never walks the directory again.
+"""
+import os
+import threading
+import time
+
+from lazy import lazy_import
+from normalize import VISIT_COLUMNS
+
+pd = lazy_import("pandas")
+pq = lazy_import("pyarrow.parquet")
+
+
+class VisitStore:
+    def __init__(self, root, compact_after=32):
+        self.root = root
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.refresh()
+
+    def refresh(self):
+        """Re-list the partitions, picking up days another process has written."""
+        self._days = {
+            name[len("date="):] for name in os.listdir(self.root)
+            if name.startswith("date=") and self.segments(name[len("date="):])
+        }
+
+    def _partition_dir(self, day):
+        return os.path.join(self.root, f"date={day}")
+
+    def days(self, start=None, end=None):
+        """Sorted 'YYYY-MM-DD' partitions holding data, optionally within [start, end]."""
+        return sorted(
+            d for d in self._days
+            if (start is None or d >= start) and (end is None or d <= end)
+        )
+
+    def segments(self, day):
+        folder = self._partition_dir(day)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(
+            os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".parquet")
+        )
+
+    def is_empty(self):
+        return not self.days()
+
+    def append(self, rows):
+        """Write rows as new segments, one per day. Returns the days touched."""
+        df = pd.DataFrame(rows, columns=VISIT_COLUMNS)
+        if df.empty:
+            return []
+        df = df.fillna("").astype(str).drop_duplicates()
+
+        touched = []
+        with self._lock:
+            for day, part in df.groupby(df["timestamp"].str[:10], sort=True):
+                folder = self._partition_dir(day)
+                os.makedirs(folder, exist_ok=True)
+                self._write_segment(part, os.path.join(folder, f"seg-{time.time_ns()}.parquet"))
+                self._days = self._days | {day}  # swapped, never mutated: readers may be iterating
+                touched.append(day)
+                if len(self.segments(day)) > self.compact_after:
+                    self._compact_day(day)
+        return touched
+
+    def _write_segment(self, df, path):
+        tmp_path = path + ".tmp"
+        df[VISIT_COLUMNS].to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def read_day(self, day):
+        frames = self._read_segments(day)
+        if not frames:
+            return pd.DataFrame(columns=VISIT_COLUMNS)
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+
+    def _read_segments(self, day, attempts=3):
+        # Readers take no lock: a compaction may delete segments between
+        # listing and reading them, in which case the merged one is listed next time
+        for attempt in range(attempts):
+            try:
+                return [pd.read_parquet(p) for p in self.segments(day)]
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+
+    def iter_days(self, start=None, end=None):
+        """Yield one DataFrame per stored day within [start, end], oldest first."""
+        for day in self.days(start, end):
+            yield self.read_day(day)
+
+    def iter_batches(self, start=None, end=None, batch_rows=50_000):
+        """Yield DataFrames of at most batch_rows visits, oldest day first.
+
+        Compacted days (one segment) are streamed from Parquet row batches,
+        so memory stays bounded however large the history is. Days with
+        several segments are read whole, to drop duplicates across them.
+        """
+        for day in self.days(start, end):
+            segments = self.segments(day)
+            parquet = None
+            if len(segments) == 1:
+                try:
+                    parquet = pq.ParquetFile(segments[0])  # an open file survives a later compaction
+                except FileNotFoundError:
+                    pass
+            if parquet is not None:
+                for batch in parquet.iter_batches(batch_size=batch_rows):
+                    yield batch.to_pandas()
+            else:
+                df = self.read_day(day)
+                for i in range(0, len(df), batch_rows):
+                    yield df.iloc[i:i + batch_rows]
+
+    def read_range(self, start=None, end=None):
+        """All visits with start <= day <= end (inclusive, 'YYYY-MM-DD' strings)."""
+        frames = list(self.iter_days(start, end))
+        if not frames:
+            return pd.DataFrame(columns=VISIT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def read_all(self):
+        return self.read_range()
+
+    def compact(self, day=None):
+        """Merge each day's segments into a single deduplicated segment."""
+        with self._lock:
+            for d in ([day] if day else self.days()):
+                if len(self.segments(d)) > 1:
+                    self._compact_day(d)
+
+    def _compact_day(self, day):
+        old_segments = self.segments(day)
+        merged = self.read_day(day)
+        self._write_segment(merged, os.path.join(self._partition_dir(day), f"seg-{time.time_ns()}.parquet"))
+        for path in old_segments:
+            os.remove(path)